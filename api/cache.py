@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import time
+
+from utils.cache import LRUCache
+
+class SchemaCache(LRUCache):
+    """Cache for GetSchemaForGame responses, keyed by appid and language.
+
+    Only the parts of a response that `Game` uses are kept, so the file stays small.
+    Each entry remembers the `gameVersion` it was fetched under. Storing a schema
+    with a different version (or calling `invalidate`) drops every language of that
+    app, and entries also expire after the TTL.
+    """
+
+    def __init__(self, max_entries=1000, ttl=None, path=None):
+        super().__init__(max_entries=max_entries, ttl=ttl, path=path)
+        self._parsed = OrderedDict()  # key -> (response, parsed result)
+
+    @staticmethod
+    def _key(app_id, l):
+        return f"{app_id}:{l}"
+
+    def get_schema(self, app_id, l="en"):
+        return self.get(self._key(app_id, l))
+
+    def has_schema(self, app_id, l="en"):
+        """Whether a fresh schema is cached, without counting a lookup"""
+        return self._lookup(self._key(app_id, l)) is not None
+
+    @staticmethod
+    def trim(response):
+        """Keep only what `Game` reads; the schema's stats list and other extras can be large"""
+        game = response.get('game', {})
+        trimmed = {key: game[key] for key in ('gameName', 'gameVersion') if key in game}
+        if 'availableGameStats' in game:
+            trimmed['availableGameStats'] = {'achievements': game['availableGameStats'].get('achievements', [])}
+        return {'game': trimmed}
+
+    def set_schema(self, app_id, l, response):
+        response = self.trim(response)
+        version = response['game'].get('gameVersion')
+        for key in self._app_keys(app_id):
+            cached = self._data[key][1]
+            if cached.get('game', {}).get('gameVersion') != version:
+                self.pop(key)
+        self.set(self._key(app_id, l), response)
+        return response
+
+    def parsed(self, key, response, parse):
+        """Return `parse(response)`, computed once per cached response"""
+        key = self._key(*key)
+        entry = self._parsed.get(key)
+        if entry is None or entry[0] is not response:
+            entry = (response, parse(response))
+            self._parsed[key] = entry
+            while len(self._parsed) > self.max_entries:
+                self._parsed.popitem(last=False)
+        self._parsed.move_to_end(key)
+        return entry[1]
+
+    def pop(self, key, default=None):
+        self._parsed.pop(key, None)
+        return super().pop(key, default)
+
+    def invalidate(self, app_id):
+        """Drop every cached language of `app_id`"""
+        for key in self._app_keys(app_id):
+            self.pop(key)
+
+    def _app_keys(self, app_id):
+        prefix = f"{app_id}:"
+        return [key for key in self._data if key.startswith(prefix)]
+
+    # `SteamClient.call` cache protocol
+    def lookup(self, key):
+        return self.get_schema(*key)
+
+    def store(self, key, response):
+        return self.set_schema(*key, response)
+
+class NegativeCache(LRUCache):
+    """Apps (or a user's app) Steam has no achievement data for, skipped until their backoff runs out.
+
+    Keys are `app:<appid>` for games without achievements or a schema Steam refuses,
+    and `user:<steamid>:<appid>` for player achievements Steam refuses (private stats,
+    tools, soundtracks). Every repeated miss doubles the backoff, up to `max_backoff`.
+    """
+
+    def __init__(self, backoff, max_backoff, max_entries=10000, path=None):
+        super().__init__(max_entries=max_entries, path=path)
+        self.backoff = backoff  # seconds
+        self.max_backoff = max_backoff
+
+    @staticmethod
+    def app_key(app_id):
+        return f"app:{app_id}"
+
+    @staticmethod
+    def user_key(steam_id, app_id):
+        return f"user:{steam_id}:{app_id}"
+
+    def blocked(self, key):
+        """Whether `key` is still backing off; not counted as a lookup"""
+        entry = self._data.get(key)
+        return entry is not None and time.time() < entry[1][0]
+
+    def blocked_any(self, *keys):
+        """Whether any of `keys` is still backing off, counted as one hit or miss"""
+        if any(self.blocked(key) for key in keys):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key):
+        """Skip `key` for the next backoff period, twice as long as the previous one"""
+        entry = self._data.get(key)
+        failures = entry[1][1] + 1 if entry is not None else 1
+        delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+        self.set(key, [time.time() + delay, failures])
+        return delay
+
+    def clear(self, key):
+        self.pop(key)
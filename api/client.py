@@ -1,22 +1,256 @@
+import asyncio
+import time
+
+import aiohttp
 import requests
 
+from utils.http import get_session
+from utils.metrics import metrics
+from .errors import NoStats
+from .keypool import KeyPool
+from .ratelimit import RETRY_STATUSES, CircuitBreaker, CircuitOpen, backoff_delay, retry_after
+from .recording import describe_error, request_key
+
+DEFAULT_BASE_URL = "https://api.steampowered.com"
+# What Steam says when there are no stats to show, in case `success` is missing
+NO_STATS_ERRORS = ('Requested app has no stats', 'Profile is not public')
+
+class _LeaderCancelled(Exception):
+    """Handed to coalesced callers when the caller running the load was cancelled"""
+
+async def no_stats_reason(response):
+    """Steam's explanation of a 4xx that means there are no stats to show, or None for any other error"""
+    try:
+        body = await response.json(content_type=None)
+    except ValueError:
+        return None
+    stats = body.get('playerstats') if isinstance(body, dict) else None
+    if not isinstance(stats, dict):
+        return None
+    if stats.get('success') is False or stats.get('error') in NO_STATS_ERRORS:
+        return stats.get('error') or "no stats"
+    return None
+
 class SteamClient:
-    def __init__(self, api_key):
+    asynchronous = False
+    # Optional `api.recording.Recorder` / `Replayer`: record every response, or serve recorded ones
+    recorder = None
+    replayer = None
+
+    def __init__(self, api_key, schema_cache=None, base_url=DEFAULT_BASE_URL):
         self.api_key = api_key
+        self.schema_cache = schema_cache
+        self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
 
     def _get(self, endpoint, params=None):
         if params is None:
             params = {}
         params['key'] = self.api_key
-        response = self.session.get(f"https://api.steampowered.com/{endpoint}/", params=params)
+        response = self.session.get(f"{self.base_url}/{endpoint}/", params=params)
         response.raise_for_status()
         return response.json()
 
+    def call(self, endpoint, params, parse, cache=None, cache_key=None):
+        """Request `endpoint` and hand the JSON response to `parse`.
+
+        When a `cache` (lookup/store) is given, a cached response for `cache_key` is
+        parsed instead of hitting the network; `store` returns the response as cached.
+        """
+        response = cache.lookup(cache_key) if cache is not None else None
+        if response is None:
+            response = self._fetch(endpoint, params)
+            if cache is not None:
+                response = cache.store(cache_key, response)
+        elif self.recorder is not None:
+            self.recorder.record(endpoint, params, response, cached=True)
+        return parse(response)
+
+    def _fetch(self, endpoint, params):
+        if self.replayer is not None:
+            return self.replayer.response(endpoint, params)
+        if self.recorder is None:
+            return self._get(endpoint, dict(params or {}))
+        try:
+            response = self._get(endpoint, dict(params or {}))
+        except Exception as e:
+            self.recorder.record(endpoint, params, error=describe_error(e))
+            raise
+        self.recorder.record(endpoint, params, response)
+        return response
+
     def user(self, steam_id):
         from .users import Users
         return Users(self, steam_id)
 
     def game(self):
         from .game import Game
-        return Game(self)
\ No newline at end of file
+        return Game(self)
+
+class AsyncSteamClient(SteamClient):
+    """SteamClient for asyncio code.
+
+    Requests go through the shared keep-alive pool from `utils.http`, so the event
+    loop is never blocked and TLS connections are reused across users and cycles.
+    `Users` and `Game` methods return awaitables when bound to this client.
+    Every request picks an API key from a `KeyPool`, so one client serves all users.
+    Identical requests made while one is already in flight wait for its response
+    instead of going out again (single-flight), e.g. friends playing the same game.
+    """
+    asynchronous = True
+    # Upper bound on in-flight requests across every client/key in the process
+    _global_limit = None
+
+    def __init__(self, keys, schema_cache=None, max_retries=3, base_url=DEFAULT_BASE_URL,
+                 breaker_threshold=5, breaker_reset=60.0):
+        # A single key string gets a pool of its own with default limits
+        self.keys = keys if isinstance(keys, KeyPool) else KeyPool([keys])
+        self.schema_cache = schema_cache
+        self.max_retries = max_retries
+        self.base_url = base_url.rstrip('/')
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers = {}  # endpoint name -> CircuitBreaker
+        self._inflight = {}  # request or game key -> future shared by concurrent callers
+
+    @classmethod
+    def set_global_concurrency(cls, max_concurrency):
+        cls._global_limit = asyncio.Semaphore(max_concurrency)
+
+    def breaker(self, name):
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+        return breaker
+
+    async def _get(self, endpoint, params=None):
+        params = dict(params or {})
+        if AsyncSteamClient._global_limit is None:
+            AsyncSteamClient.set_global_concurrency(16)
+        name = endpoint.split('/')[1] if '/' in endpoint else endpoint  # e.g. GetPlayerAchievements
+        breaker = self.breaker(name)
+        for attempt in range(self.max_retries + 1):
+            # While Steam keeps failing this endpoint, fail fast instead of queueing more requests
+            if not breaker.allow():
+                metrics.inc('steam_circuit_rejected_total', endpoint=name)
+                raise CircuitOpen(f"{name} is failing, not calling it for now")
+            # Pick a key per attempt, so a throttled key fails over to the others
+            api_key = await self.keys.acquire()
+            bucket = api_key.bucket
+            last_attempt = attempt == self.max_retries
+            delay = 0
+            try:
+                async with AsyncSteamClient._global_limit, api_key.limit:
+                    session = get_session()
+                    started = time.perf_counter()
+                    async with session.get(f"{self.base_url}/{endpoint}/", params={**params, 'key': api_key.key}) as response:
+                        metrics.inc('steam_requests_total', endpoint=name, status=response.status)
+                        if response.status >= 500:
+                            breaker.failure()
+                        else:
+                            breaker.success()
+                        if 400 <= response.status < 500 and response.status not in RETRY_STATUSES:
+                            reason = await no_stats_reason(response)
+                            if reason is not None:
+                                raise NoStats(response.request_info, response.history, status=response.status,
+                                              message=reason, headers=response.headers)
+                            # A bare 403 is Steam refusing the key itself: drop it and try another one
+                            if response.status == 403 and self.keys.revoke(api_key) and not last_attempt:
+                                continue
+                        if response.status not in RETRY_STATUSES or last_attempt:
+                            response.raise_for_status()
+                            data = await response.json(content_type=None)
+                            metrics.observe('steam_request_seconds', time.perf_counter() - started, endpoint=name)
+                            return data
+                        # Rate limited or Steam is struggling: back off, honouring Retry-After.
+                        # A throttled key sits out; the next attempt picks another one if possible.
+                        if response.status == 429:
+                            bucket.throttle(retry_after(response.headers) or backoff_delay(attempt))
+                        else:
+                            delay = retry_after(response.headers) or backoff_delay(attempt)
+            except NoStats:
+                # An answer, not a failure: already counted in steam_requests_total
+                raise
+            except aiohttp.ClientResponseError:
+                bucket.errors += 1
+                metrics.inc('steam_request_errors_total', endpoint=name)
+                raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                breaker.failure()
+                if last_attempt:
+                    bucket.errors += 1
+                    metrics.inc('steam_request_errors_total', endpoint=name)
+                    raise
+                delay = backoff_delay(attempt)
+            bucket.retries += 1
+            metrics.inc('steam_request_retries_total', endpoint=name)
+            if delay:
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        """Request budget and throttling per API key"""
+        return self.keys.stats()
+
+    def breaker_stats(self):
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    async def _fetch(self, endpoint, params):
+        if self.replayer is not None:
+            return self.replayer.response(endpoint, params)
+        if self.recorder is None:
+            return await self._get(endpoint, params)
+        try:
+            response = await self._get(endpoint, params)
+        except Exception as e:
+            self.recorder.record(endpoint, params, error=describe_error(e))
+            raise
+        self.recorder.record(endpoint, params, response)
+        return response
+
+    async def _single_flight(self, key, load, name):
+        """Await `load()`, or the same load another caller already started for `key`"""
+        while (future := self._inflight.get(key)) is not None:
+            metrics.inc('steam_requests_coalesced_total', endpoint=name)
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The caller that started the load was cancelled, not us: load it ourselves
+                continue
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, even if nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _call(self, endpoint, params, parse, cache, cache_key):
+        response = cache.lookup(cache_key) if cache is not None else None
+        if response is None:
+            name = endpoint.split('/')[1] if '/' in endpoint else endpoint
+            response = await self._single_flight(request_key(endpoint, params), lambda: self._fetch(endpoint, params), name)
+            if cache is not None:
+                response = cache.store(cache_key, response)
+        elif self.recorder is not None:
+            self.recorder.record(endpoint, params, response, cached=True)
+        return parse(response)
+
+    def call(self, endpoint, params, parse, cache=None, cache_key=None):
+        return self._call(endpoint, params, parse, cache, cache_key)
+
+    async def get_game(self, app_id, l="en"):
+        """A `Game` with the schema of `app_id` loaded, shared by everyone asking for it concurrently"""
+        async def load():
+            game = self.game()
+            await game.get_game_achievements(app_id, l)
+            return game
+        return await self._single_flight(('game', app_id, l), load, 'GetSchemaForGame')
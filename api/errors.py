@@ -0,0 +1,4 @@
+import aiohttp
+
+class NoStats(aiohttp.ClientResponseError):
+    """Steam answered that there are no stats to show: the app has none, or the player keeps them private"""
@@ -4,23 +4,51 @@ class Game:
         self.gamename = None
         self.gameversion = None
         self.achievements = []
+        self.index = {}  # apiname -> position in `achievements`
 
     def get_game_achievements(self, app_id, l="en"):
         """Fetch game achievements"""
         endpoint = 'ISteamUserStats/GetSchemaForGame/v2/'
-        params = {'key': self.client.api_key, 'appid': app_id, 'l': l}
-        response = self.client._get(endpoint, params)
-        self.gamename = response['game']['gameName']
-        self.gameversion = response['game']['gameVersion']
-        if 'achievements' in response['game']['availableGameStats']:
-            self.achievements = [GameAchievement(a) for a in response['game']['availableGameStats']['achievements']]
+        params = {'appid': app_id, 'l': l}
+        # The schema rarely changes, so use the client's schema cache when it has one
+        cache = getattr(self.client, 'schema_cache', None)
+        return self.client.call(
+            endpoint, params,
+            lambda response: self._parse_game_achievements(response, cache, (app_id, l)),
+            cache=cache, cache_key=(app_id, l),
+        )
+
+    def _parse_game_achievements(self, response, cache=None, cache_key=None):
+        # Apps without stats (tools, soundtracks, ...) come back as {"game": {}}
+        game = response.get('game', {})
+        self.gamename = game.get('gameName')
+        self.gameversion = game.get('gameVersion')
+        # A cached schema is parsed and indexed once, then shared by every user and cycle
+        if cache is not None:
+            self.achievements, self.index = cache.parsed(cache_key, response, Game.parse_achievements)
         else:
-            self.achievements = []
+            self.achievements, self.index = Game.parse_achievements(response)
         return response
 
+    @staticmethod
+    def parse_achievements(response):
+        """Build the achievement list and its apiname index from a schema response"""
+        stats = response.get('game', {}).get('availableGameStats', {})
+        achievements = [GameAchievement(a, i) for i, a in enumerate(stats.get('achievements', []))]
+        index = {a.name: i for i, a in enumerate(achievements)}
+        return achievements, index
+
+    def get_achievement(self, apiname):
+        """Look up a schema achievement by apiname"""
+        position = self.index.get(apiname)
+        return self.achievements[position] if position is not None else None
+
 class GameAchievement:
-    def __init__(self, data):
+    __slots__ = ('name', 'position', 'defaultvalue', 'displayname', 'hidden', 'description', 'icon', 'icongray')
+
+    def __init__(self, data, position=None):
         self.name = data['name']
+        self.position = position  # index in the schema, i.e. the achievement's snapshot bit
         self.defaultvalue = data['defaultvalue']
         self.displayname = data['displayName']
         self.hidden = data['hidden']
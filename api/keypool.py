@@ -0,0 +1,71 @@
+import asyncio
+import random
+
+from utils.custom_logger import logger
+from .ratelimit import TokenBucket
+
+class ApiKey:
+    """One Steam API key with its own request budget and concurrency limit"""
+    __slots__ = ('key', 'bucket', 'limit', 'rejected')
+
+    def __init__(self, key, bucket, max_concurrency):
+        self.key = key
+        self.bucket = bucket
+        self.limit = asyncio.Semaphore(max_concurrency)
+        self.rejected = False  # Steam refused it
+
+    def stats(self):
+        return {'key': f"...{self.key[-4:]}", **self.bucket.stats()}
+
+class KeyPool:
+    """Spreads requests from every user over every configured API key.
+
+    Each request takes a token from a key picked at random, weighted by its
+    remaining budget, so load evens out across keys. Throttled or exhausted keys
+    are skipped while any other key has budget; otherwise the request waits for
+    whichever key frees up first. Keys Steam refuses are taken out of the pool.
+    """
+
+    def __init__(self, keys, requests_per_day=95000, burst=25, max_concurrency=4):
+        keys = list(dict.fromkeys(key for key in keys if key))
+        if not keys:
+            raise ValueError("At least one Steam API key is required")
+        self.keys = [ApiKey(key, TokenBucket.per_day(requests_per_day, burst), max_concurrency) for key in keys]
+
+    def __len__(self):
+        return len(self.keys)
+
+    async def acquire(self):
+        """Wait for a request token and return the key it belongs to"""
+        while True:
+            ready = [api_key for api_key in self.keys if api_key.bucket.remaining >= 1]
+            if ready:
+                api_key = random.choices(ready, weights=[k.bucket.remaining for k in ready])[0]
+                if not api_key.bucket.try_acquire():
+                    return api_key
+                continue
+            # Every key is exhausted or throttled: wait for the one that frees up first
+            wait, api_key = min(((k.bucket.time_until_token(), k) for k in self.keys), key=lambda item: item[0])
+            if not wait:
+                continue
+            api_key.bucket.waits += 1
+            api_key.bucket.wait_time += wait
+            await asyncio.sleep(wait)
+
+    def revoke(self, api_key):
+        """Stop using a key Steam refused and return whether other keys are left to use.
+
+        The last key stays in the pool, as there is nothing to fall back to.
+        """
+        if api_key.rejected:
+            return api_key not in self.keys
+        api_key.rejected = True
+        if len(self.keys) == 1:
+            logger.error(f"Steam refused API key {api_key.stats()['key']} (403), and it is the only one configured")
+            return False
+        self.keys.remove(api_key)
+        logger.error(f"Steam refused API key {api_key.stats()['key']} (403), no longer using it; {len(self.keys)} key(s) left")
+        return True
+
+    def stats(self):
+        return [api_key.stats() for api_key in self.keys]
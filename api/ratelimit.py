@@ -0,0 +1,151 @@
+import random
+import time
+
+# Retry these statuses (and connection errors) instead of failing the request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Token bucket pacing the requests made with one API key.
+
+    Refills `rate` tokens per second up to `capacity`, so short bursts go out at
+    once while the sustained rate stays under the key's daily budget. A 429 with
+    Retry-After pauses the bucket entirely via `throttle`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.throttled_until = 0.0
+        self.requests = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.throttles = 0
+        self.retries = 0
+        self.errors = 0
+
+    @classmethod
+    def per_day(cls, requests_per_day, burst):
+        return cls(requests_per_day / 86400, burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    @property
+    def remaining(self):
+        """Tokens available right now (0 while throttled)"""
+        now = self._refill()
+        return 0.0 if now < self.throttled_until else self.tokens
+
+    def time_until_token(self):
+        """Seconds until a token is available (0 if one is available now)"""
+        now = self._refill()
+        wait = self.throttled_until - now
+        if wait > 0:
+            return wait
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        wait = self.time_until_token()
+        if not wait:
+            self.tokens -= 1
+            self.requests += 1
+        return wait
+
+    def throttle(self, seconds):
+        """Stop handing out tokens for `seconds` (Steam said we're going too fast)"""
+        self.throttles += 1
+        self.throttled_until = max(self.throttled_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'remaining': round(self.remaining, 2),
+            'waits': self.waits,
+            'wait_time': round(self.wait_time, 2),
+            'throttled': self.throttles,
+            'retries': self.retries,
+            'errors': self.errors,
+        }
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stops calling an endpoint after `threshold` consecutive failures.
+
+    While open every request fails at once. After `reset_timeout` seconds one
+    probe request is let through: success closes the breaker, failure opens it
+    again for twice as long (up to `max_timeout`).
+    """
+
+    def __init__(self, threshold=5, reset_timeout=60.0, max_timeout=900.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probing = 0.0  # start of the in-flight probe; a probe that never reports back expires after `timeout`
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        if self.failures < self.threshold:
+            return 'closed'
+        now = time.monotonic()
+        if now < self.opened_until or (self.probing and now - self.probing < self.timeout):
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        """Whether a request may go out now (claims the probe slot when half-open)"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open':
+            self.probing = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.probing = 0.0
+        self.timeout = self.reset_timeout
+
+    def failure(self):
+        self.failures += 1
+        if self.probing:
+            # The probe failed: stay open, for longer
+            self.probing = 0.0
+            self.timeout = min(self.max_timeout, self.timeout * 2)
+            self.opened_until = time.monotonic() + self.timeout
+        elif self.failures == self.threshold:
+            self.trips += 1
+            self.opened_until = time.monotonic() + self.timeout
+
+    def stats(self):
+        return {'state': self.state, 'failures': self.failures, 'trips': self.trips, 'rejected': self.rejected}
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with jitter for retry number `attempt` (0-based)"""
+    delay = min(cap, base * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+def retry_after(headers):
+    """Seconds from a Retry-After header, or None if missing or not in seconds"""
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
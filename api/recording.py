@@ -0,0 +1,180 @@
+from collections import deque
+from pathlib import Path
+import gzip
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from utils.datetime import DateUtils
+from .errors import NoStats
+from .ratelimit import CircuitOpen
+
+ARCHIVE_VERSION = 1
+
+def request_key(endpoint, params):
+    """Order-independent key of a request; the API key never takes part"""
+    return endpoint, tuple(sorted((k, str(v)) for k, v in (params or {}).items() if k != 'key'))
+
+class ReplayMiss(LookupError):
+    """The replayed cycle has no recording of this request"""
+
+class ReplayedError(RuntimeError):
+    """A recorded failure that can't be rebuilt as its original exception type"""
+
+def describe_error(error):
+    """What is recorded of a failed request: its type and HTTP status.
+
+    Never the message: aiohttp's includes the request URL, API key and all.
+    """
+    status = getattr(error, 'status', None)
+    if status is None and getattr(error, 'response', None) is not None:
+        status = getattr(error.response, 'status_code', None)
+    return {'type': type(error).__name__, 'status': status}
+
+def replay_error(endpoint, error):
+    """Rebuild the exception a recorded request failed with, so replays take the same error paths"""
+    if not isinstance(error, dict):
+        # Archives from before errors were recorded by type
+        return ReplayedError(error)
+    kind, status = error.get('type'), error.get('status')
+    message = f"replayed {kind} from {endpoint}"
+    if kind == 'HTTPError' and status is not None:
+        response = requests.Response()
+        response.status_code = status
+        return requests.HTTPError(message, response=response)
+    if status is not None:
+        request_info = aiohttp.RequestInfo(URL(f"/{endpoint}"), 'GET', CIMultiDictProxy(CIMultiDict()))
+        cls = NoStats if kind == 'NoStats' else aiohttp.ClientResponseError
+        return cls(request_info, (), status=status, message=message)
+    if kind == 'CircuitOpen':
+        return CircuitOpen(message)
+    if kind == 'TimeoutError':
+        return TimeoutError(message)
+    cls = getattr(aiohttp, kind or '', None)
+    if isinstance(cls, type) and issubclass(cls, aiohttp.ClientConnectionError):
+        return aiohttp.ClientConnectionError(message)
+    cls = getattr(requests, kind or '', None)
+    if isinstance(cls, type) and issubclass(cls, requests.ConnectionError):
+        return requests.ConnectionError(message)
+    return ReplayedError(message)
+
+class Recorder:
+    """Writes the Steam traffic of each cycle to a gzip-compressed JSON-lines archive.
+
+    The first line is a header with the cycle's start time and users, followed by
+    one line per request: endpoint, parameters without the API key, and the
+    response (or the error's type and status, see `describe_error`). Responses served from the schema cache are recorded
+    too, so a replay starting with empty caches sees the same data.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.entries = []
+        self.started = None
+        self._started_at = time.monotonic()
+        self.cycles = 0
+
+    def start_cycle(self):
+        self.entries = []
+        self.started = DateUtils.now_timestamp()
+        self._started_at = time.monotonic()
+
+    def record(self, endpoint, params, response=None, error=None, cached=False):
+        endpoint, params = request_key(endpoint, params)
+        entry = {'t': round(time.monotonic() - self._started_at, 4), 'endpoint': endpoint, 'params': dict(params)}
+        if error is not None:
+            entry['error'] = error
+        else:
+            entry['response'] = response
+        if cached:
+            entry['cached'] = True
+        self.entries.append(entry)
+
+    def finish_cycle(self, summary_users, users):
+        """Write the archive of the current cycle and return its path"""
+        return self.prepare_cycle(summary_users, users)()
+
+    def prepare_cycle(self, summary_users, users):
+        """Take the entries of the current cycle and return a function writing its archive.
+
+        Taking them is cheap and must happen on the thread recording requests; the
+        returned function does the encoding and compressing and can run in another
+        thread. It returns the path of the archive.
+        """
+        self.cycles += 1
+        started = self.started if self.started is not None else DateUtils.now_timestamp()
+        header = {'version': ARCHIVE_VERSION, 'started': started, 'summary_users': list(summary_users), 'users': list(users)}
+        path = self.directory / f"cycle-{started}-{os.getpid()}-{self.cycles:05d}.jsonl.gz"
+        entries = self.entries
+        self.entries = []
+        self.started = None
+        return lambda: self._write(path, [header] + entries)
+
+    def _write(self, path, lines):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(json.dumps(line, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+class RecordedCycle:
+    __slots__ = ('path', 'started', 'summary_users', 'users', 'entries')
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        header = lines[0]
+        self.started = header['started']
+        self.summary_users = header['summary_users']
+        self.users = header['users']
+        self.entries = lines[1:]
+
+def load_cycles(path):
+    """Recorded cycles from an archive file or a directory of archives, oldest first"""
+    path = Path(path)
+    paths = sorted(path.glob('*.jsonl.gz')) if path.is_dir() else [path]
+    return [RecordedCycle(p) for p in paths]
+
+class Replayer:
+    """Serves the responses of one recorded cycle instead of calling Steam.
+
+    Responses are matched by endpoint and parameters, so the order in which
+    concurrent requests are made doesn't matter. Repeated requests get the
+    recorded responses in order, and the last one again once those run out.
+    """
+
+    def __init__(self):
+        self.cycle = None
+        self._responses = {}
+        self.served = 0
+        self.misses = 0
+
+    def use(self, cycle):
+        self.cycle = cycle
+        self._responses = {}
+        for entry in cycle.entries:
+            self._responses.setdefault(request_key(entry['endpoint'], entry['params']), deque()).append(entry)
+
+    def response(self, endpoint, params):
+        queue = self._responses.get(request_key(endpoint, params))
+        if not queue:
+            self.misses += 1
+            raise ReplayMiss(f"No recorded response for {endpoint} {params}")
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        self.served += 1
+        if 'error' in entry:
+            raise replay_error(endpoint, entry['error'])
+        return entry['response']
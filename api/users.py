@@ -1,5 +1,8 @@
 from utils.datetime import DateUtils
 
+# GetPlayerSummaries accepts at most this many comma-separated steamids
+MAX_SUMMARIES_PER_REQUEST = 100
+
 class Users:
     """Class for fetching user-related data from Steam's API"""
 
@@ -9,21 +12,54 @@ class Users:
         self.steam_id = steam_id
         self.summary = None
         self.achievements = []
+        self.achievements_by_app = {}  # appid -> [UserAchievement], safe to fill concurrently
         self.owned_games = []
+        self.recently_played_games = []
+
+    def __getstate__(self):
+        # Users are sent between processes in sharded mode; the client and game lists stay behind
+        state = self.__dict__.copy()
+        state.update(client=None, achievements=[], owned_games=[], recently_played_games=[])
+        return state
 
     def get_user_summaries(self):
         """Fetch user summaries"""
         endpoint = "ISteamUser/GetPlayerSummaries/v0002"
         params = {"steamids": self.steam_id}
-        response = self.client._get(endpoint, params)
+        return self.client.call(endpoint, params, self._parse_user_summaries)
+
+    def _parse_user_summaries(self, response):
         self.summary = UserSummary(response['response']['players'][0])
         return response
 
+    @staticmethod
+    def get_player_summaries(client, steam_ids):
+        """Fetch summaries of up to 100 users in a single request.
+
+        Returns a dict of steamid -> `UserSummary`; users Steam didn't return are missing.
+        """
+        endpoint = "ISteamUser/GetPlayerSummaries/v0002"
+        params = {"steamids": ",".join(steam_ids[:MAX_SUMMARIES_PER_REQUEST])}
+        return client.call(endpoint, params, Users._parse_player_summaries)
+
+    @staticmethod
+    def _parse_player_summaries(response):
+        summaries = {}
+        for player in response['response']['players']:
+            # One malformed player must not cost the other 99 their summary
+            try:
+                summaries[player['steamid']] = UserSummary(player)
+            except KeyError:
+                continue
+        return summaries
+
     def get_owned_games(self):
         """Fetch owned games games"""
         endpoint = "IPlayerService/GetOwnedGames/v0001"
         params = {"steamid": self.steam_id, "include_appinfo": 1}  # Include game name and logo information
-        response = self.client._get(endpoint, params)
+        return self.client.call(endpoint, params, self._parse_owned_games)
+
+    def _parse_owned_games(self, response):
         self.owned_games = [UserOwnedGame(game) for game in response['response']['games']]
         return response
     
@@ -34,7 +70,9 @@ class Users:
         """
         endpoint = "IPlayerService/GetRecentlyPlayedGames/v1"
         params = {"steamid": self.steam_id, "count": count}
-        response = self.client._get(endpoint, params)
+        return self.client.call(endpoint, params, self._parse_recently_played_games)
+
+    def _parse_recently_played_games(self, response):
         games = response.get('response', {}).get('games', [])
         self.recently_played_games = [UserRecentlyPlayedGame(g) for g in games]
         return response
@@ -43,48 +81,68 @@ class Users:
         """Fetch user achievements"""
         endpoint = "ISteamUserStats/GetPlayerAchievements/v0001"
         params = {"steamid": self.steam_id, "appid": app_id, "l": l}
-        response = self.client._get(endpoint, params)
+        return self.client.call(endpoint, params, lambda response: self._parse_user_achievements(response, app_id))
+
+    def _parse_user_achievements(self, response, app_id):
         if 'achievements' in response['playerstats']:
             self.achievements = [UserAchievement(a, app_id) for a in response['playerstats']['achievements']]
         else:
             self.achievements = []
+        self.achievements_by_app[app_id] = self.achievements
         return response
 
 class UserAchievement:
+    __slots__ = ('appid', 'apiname', 'achieved', 'unlocktime', 'name', 'description')
+
     def __init__(self, data, appid):  # Add appid parameter
         self.appid = appid  # Store appid
         self.apiname = data['apiname']
         self.achieved = data['achieved']
-        self.unlocktime = DateUtils.format_timestamp(data['unlocktime'])
+        self.unlocktime = int(data['unlocktime'])  # epoch seconds, format with DateUtils when rendering
         self.name = data['name']
         self.description = data.get('description', '')
 
 class UserSummary:
+    __slots__ = ('steamid', 'personaname', 'profileurl', 'avatarfull', 'lastonline', 'timecreated', 'personastate', 'gameid')
+
     def __init__(self, data):
+        self.steamid = data.get('steamid')
         self.personaname = data['personaname']
         self.profileurl = data['profileurl']
         self.avatarfull = data['avatarfull']
-        self.lastonline = DateUtils.format_timestamp(data['lastlogoff'])
-        self.timecreated = DateUtils.format_timestamp(data['timecreated'])
-        self.age = DateUtils.calculate_age(data['timecreated'])
+        # Private profiles leave these out
+        self.lastonline = data.get('lastlogoff')  # epoch seconds
+        self.timecreated = data.get('timecreated')  # epoch seconds
+        self.personastate = data.get('personastate', 0)  # 0 = offline
+        self.gameid = data.get('gameid')  # set while the user is in-game
+
+    @property
+    def age(self):
+        return DateUtils.calculate_age(self.timecreated) if self.timecreated is not None else None
 
 class UserOwnedGame:
+    __slots__ = ('appid', 'name', 'url', 'game_icon', 'last_played', 'playtime_forever')
+
     def __init__(self, game_dict):
         self.appid = game_dict['appid']
         self.name = game_dict.get('name', '')
+        self.playtime_forever = game_dict.get('playtime_forever', 0)  # minutes
         self.url = f"https://store.steampowered.com/app/{game_dict['appid']}"
         try:
             self.game_icon = f"http://media.steampowered.com/steamcommunity/public/images/apps/{game_dict['appid']}/{game_dict['img_icon_url']}.jpg"
-            self.last_played = DateUtils.format_timestamp(game_dict['rtime_last_played'])
+            self.last_played = int(game_dict['rtime_last_played'])  # epoch seconds
         except KeyError:
             self.game_icon = ""
-            self.last_played = "Unknown"
+            self.last_played = None
 
 
 class UserRecentlyPlayedGame:
+    __slots__ = ('appid', 'name', 'url', 'game_icon', 'last_played', 'playtime_forever')
+
     def __init__(self, game_dict):
         self.appid = game_dict.get('appid')
         self.name = game_dict.get('name', '')
+        self.playtime_forever = game_dict.get('playtime_forever', 0)  # minutes
         self.url = f"https://store.steampowered.com/app/{self.appid}"
         # Build icon URL when available
         img_icon = game_dict.get('img_icon_url') or game_dict.get('img_logo_url') or ''
@@ -95,6 +153,6 @@ class UserRecentlyPlayedGame:
         # recently-played may provide a last_played or rtime_last_played field; fall back safely
         last_played_ts = game_dict.get('rtime_last_played') or game_dict.get('last_played')
         try:
-            self.last_played = DateUtils.format_timestamp(last_played_ts) if last_played_ts is not None else "Unknown"
-        except Exception:
-            self.last_played = "Unknown"
\ No newline at end of file
+            self.last_played = int(last_played_ts) if last_played_ts is not None else None
+        except (TypeError, ValueError):
+            self.last_played = None
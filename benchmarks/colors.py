@@ -0,0 +1,86 @@
+"""Benchmark dominant-color extraction over a folder of sample images.
+
+Compares the original per-pixel `np.apply_along_axis` implementation with the
+vectorized `utils.image.dominant_color`, optionally also with downsampling, and
+checks the picked colors against the original.
+
+Usage: python -m benchmarks.colors FOLDER [--max-pixels N] [--repeat N]
+"""
+from pathlib import Path
+import argparse
+import time
+
+from PIL import Image
+import numpy as np
+
+from utils.image import dominant_color, is_colorful
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+def legacy_dominant_color(img, crop_percentage=0.5):
+    """Color extraction as it was before vectorization"""
+    width, height = img.size
+    crop_width = int(width * crop_percentage)
+    crop_height = int(height * crop_percentage)
+    left = (width - crop_width) // 2
+    top = (height - crop_height) // 2
+    img = img.crop((left, top, left + crop_width, top + crop_height))
+    img = img.convert("RGB")
+    img_flattened = np.array(img).reshape(-1, 3)
+    colorfulness = np.apply_along_axis(is_colorful, 1, img_flattened)
+    most_colorful_color = img_flattened[np.argmax(colorfulness)]
+    return int('0x{:02x}{:02x}{:02x}'.format(*most_colorful_color), 16)
+
+def color_distance(a, b):
+    """Euclidean RGB distance between two color ints"""
+    ca = np.array([(a >> 16) & 0xff, (a >> 8) & 0xff, a & 0xff], dtype=float)
+    cb = np.array([(b >> 16) & 0xff, (b >> 8) & 0xff, b & 0xff], dtype=float)
+    return float(np.linalg.norm(ca - cb))
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('folder', type=Path)
+    parser.add_argument('--max-pixels', type=int, default=4096, help='pixel budget for the downsampled run (0 to skip)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in args.folder.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        parser.error(f"no images found in {args.folder}")
+
+    totals = {'legacy': 0.0, 'vectorized': 0.0, 'downsampled': 0.0}
+    mismatches = 0
+    max_distance = 0.0
+    for path in paths:
+        img = Image.open(path)
+        img.load()
+        legacy, legacy_time = timed(lambda: legacy_dominant_color(img), args.repeat)
+        vectorized, vectorized_time = timed(lambda: dominant_color(img), args.repeat)
+        totals['legacy'] += legacy_time
+        totals['vectorized'] += vectorized_time
+        if vectorized != legacy:
+            mismatches += 1
+        line = f"{path.name:40} {img.size[0]}x{img.size[1]:<6} legacy {legacy_time * 1000:9.2f} ms  vectorized {vectorized_time * 1000:7.2f} ms"
+        if args.max_pixels:
+            downsampled, downsampled_time = timed(lambda: dominant_color(img, max_pixels=args.max_pixels), args.repeat)
+            totals['downsampled'] += downsampled_time
+            distance = color_distance(downsampled, legacy)
+            max_distance = max(max_distance, distance)
+            line += f"  downsampled {downsampled_time * 1000:7.2f} ms (distance {distance:.1f})"
+        print(line)
+
+    print()
+    print(f"{len(paths)} images, {args.repeat} runs each")
+    print(f"vectorized: {totals['legacy'] / totals['vectorized']:.1f}x faster, {mismatches} color mismatches")
+    if args.max_pixels:
+        print(f"downsampled to {args.max_pixels} px: {totals['legacy'] / totals['downsampled']:.1f}x faster, "
+              f"max RGB distance {max_distance:.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Benchmark full poll-and-deliver cycles against a local fake Steam API and Discord channel.
+
+Starts `benchmarks.fake_steam` in-process, points the Steam client at it and runs
+the bot's cycle (fetch, match, colors, embeds, delivery) for every combination of
+user count, library size and achievements per game. Each combination runs a
+cold cycle (empty caches and snapshots) followed by warm cycles in which every
+user's active games gain one unlock. Reports wall time, time until the first
+message reached the channel, CPU time of this process, peak Python memory,
+Steam requests and messages sent per cycle.
+
+Usage: python -m benchmarks.cycle [--users 1,10,50] [--games 50] [--achievements 50]
+                                  [--active 0.1] [--no-stats 0.0] [--latency SECONDS] [--cycles N] [--no-memory]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+import tracemalloc
+
+# The bot reads its configuration at import time: fill in what a benchmark doesn't care
+# about and lift the per-key pacing, so the numbers show the code rather than the budget
+for name, value in {
+    'DISCORD_TOKEN': 'benchmark', 'ACHIEVEMENT_TIME': '60', 'ACHIEVEMENT_CHANNEL': '1', 'PLATINUM_CHANNEL': '2',
+    'INTERVAL_MINUTES': '5', 'STEAM_API_KEY': 'benchmark', 'STEAM_REQUESTS_PER_DAY': '1000000000', 'STEAM_BURST': '100000',
+}.items():
+    os.environ.setdefault(name, value)
+
+from benchmarks.fake_steam import FakeSteam
+from src.discord.cogs.tasks import TasksCog
+from src.steam import functions
+from src.steam.snapshots import AchievementSnapshots, PlaytimeSnapshots
+from utils import image
+from utils.http import close_session, get_session
+
+MEDIA_URL = "http://media.steampowered.com"
+
+class LocalMedia:
+    """Session stand-in for `utils.image` that fetches Steam CDN icons from the fake server"""
+
+    def __init__(self, base_url):
+        self.media_url = f"{base_url}/media"
+
+    def get(self, url, **kwargs):
+        if url.startswith(MEDIA_URL):
+            url = self.media_url + url[len(MEDIA_URL):]
+        return get_session().get(url, **kwargs)
+
+class FakeChannel:
+    """Records what would have been sent to a Discord channel"""
+
+    def __init__(self, channel_id, send_latency=0.0):
+        self.id = channel_id
+        self.send_latency = send_latency
+        self.messages = 0
+        self.embeds = 0
+        self.first_sent = None  # perf_counter time of the first message since the last reset
+
+    async def send(self, embeds):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        if self.first_sent is None:
+            self.first_sent = time.perf_counter()
+        self.messages += 1
+        self.embeds += len(embeds)
+
+class FakeBot:
+    def __init__(self, send_latency=0.0):
+        self.channels = {}
+        self.send_latency = send_latency
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self.send_latency)
+        return self.channels[channel_id]
+
+def reset_state():
+    """Forget everything a previous run cached, without touching the on-disk caches"""
+    functions.achievement_snapshots = AchievementSnapshots()
+    functions.playtime_snapshots = PlaytimeSnapshots()
+    functions.state_store.close()
+    functions.state_store.path = ':memory:'
+    functions.user_activity.clear()
+    for cache in (functions.schema_cache, functions.summary_cache, functions.negative_cache, image.color_cache):
+        cache.path = None
+        for key in list(cache.keys()):
+            cache.pop(key)
+        cache.hits = cache.misses = 0
+    functions.schema_cache._parsed.clear()
+
+def make_cog(bot):
+    # Only the delivery half of the cog is needed; skip __init__ so no task loop starts
+    cog = TasksCog.__new__(TasksCog)
+    cog.bot = bot
+    cog.completed_games = functions.state_store.completed_games()
+    cog.delivery_queues = {}
+    return cog
+
+async def run_cycle(cog, user_ids):
+    await functions.refresh_user_summaries(user_ids, max_age=0)
+    all_achievements = await cog.poll_and_deliver(lambda on_user: functions.get_all_achievements(user_ids, on_user))
+    functions.commit_state()
+    return len(all_achievements)
+
+async def run(users, games, achievements, args):
+    steam = FakeSteam(games, achievements, args.latency, args.active, no_stats=args.no_stats)
+    functions.steam_client.base_url = await steam.start()
+    image.get_session = lambda: LocalMedia(steam.base_url)
+    reset_state()
+    bot = FakeBot(args.send_latency)
+    cog = make_cog(bot)
+    user_ids = [str(76561198000000000 + i) for i in range(users)]
+    rows = []
+    try:
+        for cycle in range(args.cycles):
+            requests_before = sum(steam.requests.values()) - steam.requests['icon']
+            messages_before = sum(channel.messages for channel in bot.channels.values())
+            for channel in bot.channels.values():
+                channel.first_sent = None
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            started, cpu = time.perf_counter(), time.process_time()
+            found = await run_cycle(cog, user_ids)
+            wall, cpu = time.perf_counter() - started, time.process_time() - cpu
+            first_sent = [channel.first_sent for channel in bot.channels.values() if channel.first_sent is not None]
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+            rows.append({
+                'cycle': 'cold' if cycle == 0 else f"warm{cycle}",
+                'wall': wall,
+                'first': min(first_sent) - started if first_sent else None,
+                'cpu': cpu,
+                'peak': peak,
+                'requests': sum(steam.requests.values()) - steam.requests['icon'] - requests_before,
+                'found': found,
+                'messages': sum(channel.messages for channel in bot.channels.values()) - messages_before,
+            })
+            steam.advance()
+    finally:
+        for queue in cog.delivery_queues.values():
+            await queue.close()
+        await steam.stop()
+    return rows, steam.requests
+
+def int_list(value):
+    return [int(part) for part in value.split(',')]
+
+async def main_async(args):
+    if not args.no_memory:
+        tracemalloc.start()
+    print(f"{'users':>5} {'games':>5} {'achs':>5} {'cycle':>6} {'wall s':>8} {'first s':>8} {'cpu s':>8} {'peak MB':>8} "
+          f"{'reqs':>6} {'req/user':>8} {'found':>6} {'msgs':>5}")
+    try:
+        for users, games, achievements in itertools.product(args.users, args.games, args.achievements):
+            rows, requests = await run(users, games, achievements, args)
+            for row in rows:
+                first = f"{row['first']:>8.3f}" if row['first'] is not None else f"{'-':>8}"
+                print(f"{users:>5} {games:>5} {achievements:>5} {row['cycle']:>6} {row['wall']:>8.3f} {first} {row['cpu']:>8.3f} "
+                      f"{row['peak'] / 2**20:>8.1f} {row['requests']:>6} {row['requests'] / users:>8.1f} "
+                      f"{row['found']:>6} {row['messages']:>5}")
+            if args.verbose:
+                print(f"      requests by endpoint: {dict(requests)}")
+    finally:
+        await close_session()
+        image.shutdown_process_pool()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int_list, default=[1, 10, 50], help='comma-separated user counts')
+    parser.add_argument('--games', type=int_list, default=[50], help='comma-separated library sizes')
+    parser.add_argument('--achievements', type=int_list, default=[50], help='comma-separated achievements per game')
+    parser.add_argument('--active', type=float, default=0.1, help='fraction of each library played every cycle')
+    parser.add_argument('--no-stats', type=float, default=0.0, help='fraction of apps without achievements (400 from Steam)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every fake Steam request')
+    parser.add_argument('--send-latency', type=float, default=0.0, help='seconds added to every fake Discord send')
+    parser.add_argument('--cycles', type=int, default=3, help='cycles per combination (first one cold)')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc (it slows Python code down)')
+    parser.add_argument('--verbose', action='store_true', help='also print requests per endpoint')
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
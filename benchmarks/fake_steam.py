@@ -0,0 +1,197 @@
+"""Local stand-in for the Steam Web API, serving synthetic payloads.
+
+Serves GetPlayerSummaries, GetOwnedGames, GetRecentlyPlayedGames,
+GetSchemaForGame and GetPlayerAchievements plus icons (Steam CDN paths are
+served under /media), with a
+configurable library size, achievements per game and per-request latency.
+A fraction of the apps can have no stats at all: their schema is empty and
+GetPlayerAchievements answers 400, like tools and soundtracks on Steam.
+Every user has the same kind of library: a few "active" games that gain
+playtime and one new unlock per `advance()`, the rest untouched for months.
+
+Usage (standalone): python -m benchmarks.fake_steam [--port N] [--games N] [--achievements N] [--latency SECONDS] [--no-stats F]
+"""
+from collections import Counter
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from aiohttp import web
+from PIL import Image
+
+APPID_POOL = 5  # libraries are drawn from games * APPID_POOL appids, so users share some games
+DAY = 86400
+
+class FakeSteam:
+    def __init__(self, games=50, achievements=50, latency=0.0, active=0.1, unlocked=0.5, seed=0, no_stats=0.0):
+        self.games = games
+        self.achievements = achievements
+        self.latency = latency  # seconds added to every request
+        self.active = max(1, int(games * active))  # games played each cycle
+        self.unlocked = unlocked  # fraction of achievements unlocked at the start
+        self.seed = seed
+        self.no_stats = no_stats  # fraction of apps without achievements
+        self.cycle = 0
+        self.started = int(time.time())
+        self.requests = Counter()  # endpoint name -> requests served
+        self.base_url = None
+        self._runner = None
+        self._icons = {}
+
+    def advance(self):
+        """Move to the next cycle: active games gain playtime and one unlock each"""
+        self.cycle += 1
+
+    def library(self, steam_id):
+        rng = random.Random(f"{self.seed}:{steam_id}")
+        return rng.sample(range(10, 10 * (self.games * APPID_POOL + 1), 10), self.games)
+
+    def _game(self, steam_id, index, appid):
+        now = int(time.time())
+        if index < self.active:
+            return {'appid': appid, 'name': f"Game {appid}", 'img_icon_url': f"icon{appid}",
+                    'playtime_forever': 600 + self.cycle * 10, 'playtime_2weeks': 60 + self.cycle * 10,
+                    'rtime_last_played': now - 60}
+        return {'appid': appid, 'name': f"Game {appid}", 'img_icon_url': f"icon{appid}",
+                'playtime_forever': 600, 'rtime_last_played': self.started - 90 * DAY}
+
+    def has_stats(self, appid):
+        return random.Random(f"{self.seed}:stats:{appid}").random() >= self.no_stats
+
+    def _unlocked(self, steam_id, appid):
+        """Number of achievements this user has in this game right now"""
+        library = self.library(steam_id)
+        count = int(self.achievements * self.unlocked)
+        if appid in library and library.index(appid) < self.active:
+            count += self.cycle
+        return min(self.achievements, count)
+
+    # Endpoints
+
+    def player_summaries(self, params):
+        return {'response': {'players': [{
+            'steamid': steam_id, 'personaname': f"User {steam_id[-4:]}",
+            'profileurl': f"https://steamcommunity.com/profiles/{steam_id}/", 'avatarfull': f"{self.base_url}/icons/0/0.png",
+            'lastlogoff': int(time.time()) - 600, 'timecreated': self.started - 3000 * DAY, 'personastate': 1,
+        } for steam_id in params['steamids'].split(',')]}}
+
+    def owned_games(self, params):
+        steam_id = params['steamid']
+        games = [self._game(steam_id, index, appid) for index, appid in enumerate(self.library(steam_id))]
+        return {'response': {'game_count': len(games), 'games': games}}
+
+    def recently_played_games(self, params):
+        steam_id = params['steamid']
+        games = [self._game(steam_id, index, appid) for index, appid in enumerate(self.library(steam_id)[:self.active])]
+        return {'response': {'total_count': len(games), 'games': games}}
+
+    def schema(self, params):
+        appid = int(params['appid'])
+        if not self.has_stats(appid):
+            return {'game': {}}
+        return {'game': {'gameName': f"Game {appid}", 'gameVersion': '1', 'availableGameStats': {'achievements': [{
+            'name': f"ACH_{i}", 'defaultvalue': 0, 'displayName': f"Achievement {i}", 'hidden': 0,
+            'description': f"Do thing number {i} in game {appid}",
+            'icon': f"{self.base_url}/icons/{appid}/{i}.png", 'icongray': f"{self.base_url}/icons/{appid}/{i}.png",
+        } for i in range(self.achievements)]}}}
+
+    def player_achievements(self, params):
+        steam_id, appid = params['steamid'], int(params['appid'])
+        if not self.has_stats(appid):
+            raise web.HTTPBadRequest(text='{"playerstats":{"error":"Requested app has no stats","success":false}}',
+                                     content_type='application/json')
+        unlocked = self._unlocked(steam_id, appid)
+        base = int(self.achievements * self.unlocked)
+        now = int(time.time())
+        achievements = []
+        for i in range(self.achievements):
+            if i >= unlocked:
+                unlocktime = 0
+            elif i >= base:
+                unlocktime = now - 30 * (unlocked - i)  # unlocked this session
+            else:
+                unlocktime = self.started - (i + 1) * DAY
+            achievements.append({'apiname': f"ACH_{i}", 'achieved': int(i < unlocked), 'unlocktime': unlocktime,
+                                 'name': f"Achievement {i}", 'description': f"Do thing number {i} in game {appid}"})
+        return {'playerstats': {'steamID': steam_id, 'gameName': f"Game {appid}", 'achievements': achievements, 'success': True}}
+
+    def icon(self, appid, index):
+        key = (appid, index)
+        if key not in self._icons:
+            rng = random.Random(f"{appid}:{index}")
+            img = Image.new('RGB', (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+            img.paste(tuple(rng.randrange(256) for _ in range(3)), (16, 16, 48, 48))
+            buffer = io.BytesIO()
+            img.save(buffer, 'PNG')
+            self._icons[key] = buffer.getvalue()
+        return self._icons[key]
+
+    # Server
+
+    async def handle(self, request):
+        name = request.match_info['method']
+        self.requests[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        handler = {
+            'GetPlayerSummaries': self.player_summaries,
+            'GetOwnedGames': self.owned_games,
+            'GetRecentlyPlayedGames': self.recently_played_games,
+            'GetSchemaForGame': self.schema,
+            'GetPlayerAchievements': self.player_achievements,
+        }.get(name)
+        if handler is None:
+            raise web.HTTPNotFound()
+        return web.json_response(handler(request.query))
+
+    async def handle_icon(self, request):
+        self.requests['icon'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if 'path' in request.match_info:
+            appid, index = request.match_info['path'], 0
+        else:
+            appid, index = int(request.match_info['appid']), int(request.match_info['index'])
+        return web.Response(body=self.icon(appid, index), content_type='image/png')
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving; returns the base URL to use as STEAM_API_URL"""
+        app = web.Application()
+        app.router.add_get('/{interface}/{method}/{version}{slashes:/+}', self.handle)
+        app.router.add_get('/icons/{appid}/{index}.png', self.handle_icon)
+        app.router.add_get('/media/{path:.*}', self.handle_icon)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def serve(args):
+    steam = FakeSteam(args.games, args.achievements, args.latency, no_stats=args.no_stats)
+    print(f"Fake Steam API on {await steam.start(port=args.port)} (set STEAM_API_URL to this)")
+    while True:
+        await asyncio.sleep(3600)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--games', type=int, default=50)
+    parser.add_argument('--achievements', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--no-stats', type=float, default=0.0)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
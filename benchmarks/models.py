@@ -0,0 +1,111 @@
+"""Benchmark the model layer: formatted-string timestamps vs epoch ints.
+
+Builds a synthetic GetPlayerAchievements / GetOwnedGames payload and measures the
+per-cycle work the bot does on it (construct models, filter by time window, sort)
+with the old string-based models and the current `__slots__` epoch models.
+
+Usage: python -m benchmarks.models [--achievements N] [--games N] [--repeat N]
+"""
+from datetime import datetime, timedelta
+import argparse
+import random
+import time
+import tracemalloc
+
+from api.users import UserAchievement, UserOwnedGame
+from utils.datetime import DateUtils
+
+DATE_FORMAT = '%d/%m/%y %H:%M:%S'
+WINDOW_MINUTES = 60
+
+class LegacyUserAchievement:
+    """UserAchievement as it was before epoch timestamps"""
+    def __init__(self, data, appid):
+        self.appid = appid
+        self.apiname = data['apiname']
+        self.achieved = data['achieved']
+        self.unlocktime = DateUtils.format_timestamp(data['unlocktime'])
+        self.name = data['name']
+        self.description = data.get('description', '')
+
+class LegacyUserOwnedGame:
+    """UserOwnedGame as it was before epoch timestamps"""
+    def __init__(self, game_dict):
+        self.appid = game_dict['appid']
+        self.name = game_dict.get('name', '')
+        self.url = f"https://store.steampowered.com/app/{game_dict['appid']}"
+        try:
+            self.game_icon = f"http://media.steampowered.com/steamcommunity/public/images/apps/{game_dict['appid']}/{game_dict['img_icon_url']}.jpg"
+            self.last_played = DateUtils.format_timestamp(game_dict['rtime_last_played'])
+        except KeyError:
+            self.game_icon = ""
+            self.last_played = "Unknown"
+
+def make_payload(achievements, games):
+    now = int(time.time())
+    rng = random.Random(42)
+    player = [
+        {'apiname': f'ACH_{i}', 'achieved': rng.randint(0, 1), 'unlocktime': now - rng.randint(0, 86400 * 365),
+         'name': f'Achievement {i}', 'description': 'Synthetic achievement'}
+        for i in range(achievements)
+    ]
+    owned = [
+        {'appid': 1000 + i, 'name': f'Game {i}', 'img_icon_url': 'a' * 40,
+         'rtime_last_played': now - rng.randint(0, 86400 * 365), 'playtime_forever': rng.randint(0, 10000)}
+        for i in range(games)
+    ]
+    return player, owned
+
+def legacy_cycle(player, owned):
+    current_time = datetime.now().strftime(DATE_FORMAT)
+    window = timedelta(minutes=WINDOW_MINUTES)
+    games = [LegacyUserOwnedGame(g) for g in owned]
+    recent_games = [g for g in games if g.last_played != "Unknown"
+                    and datetime.strptime(current_time, DATE_FORMAT) - datetime.strptime(g.last_played, DATE_FORMAT) <= window]
+    achievements = [LegacyUserAchievement(a, 1) for a in player]
+    recent = [a for a in achievements if a.achieved == 1
+              and datetime.strptime(current_time, DATE_FORMAT) - datetime.strptime(a.unlocktime, DATE_FORMAT) <= window]
+    achievements.sort(key=lambda a: datetime.strptime(a.unlocktime, DATE_FORMAT))
+    return games, achievements, recent_games, recent
+
+def current_cycle(player, owned):
+    current_time = DateUtils.now_timestamp()
+    window = WINDOW_MINUTES * 60
+    games = [UserOwnedGame(g) for g in owned]
+    recent_games = [g for g in games if g.last_played is not None and current_time - g.last_played <= window]
+    achievements = [UserAchievement(a, 1) for a in player]
+    recent = [a for a in achievements if a.achieved == 1 and current_time - a.unlocktime <= window]
+    achievements.sort(key=lambda a: a.unlocktime)
+    return games, achievements, recent_games, recent
+
+def measure(cycle, player, owned, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cycle(player, owned)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    result = cycle(player, owned)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--achievements', type=int, default=5000)
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    player, owned = make_payload(args.achievements, args.games)
+    before = measure(legacy_cycle, player, owned, args.repeat)
+    after = measure(current_cycle, player, owned, args.repeat)
+
+    print(f"{args.achievements} achievements, {args.games} owned games, {args.repeat} runs")
+    print(f"{'':10}{'time/cycle':>14}{'models memory':>16}")
+    print(f"{'before':10}{before[0] * 1000:>11.2f} ms{before[1] / 1024:>13.1f} KB")
+    print(f"{'after':10}{after[0] * 1000:>11.2f} ms{after[1] / 1024:>13.1f} KB")
+    print(f"speedup {before[0] / after[0]:.1f}x, memory {after[1] / before[1]:.0%} of before")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Replay recorded Steam traffic through the bot's fetch-and-match path, with no network.
+
+Takes the archives written with STEAM_RECORD_DIR (a directory or a single file)
+and runs every recorded cycle in order, serving each request from the
+recording. By default "now" is pinned to each cycle's recorded start time, so
+the ACHIEVEMENT_TIME window matches production (run with the same
+ACHIEVEMENT_TIME). Reports wall and CPU time, replayed requests and unlocks
+found per cycle; --profile writes cProfile stats for the whole replay.
+
+Usage: python -m benchmarks.replay PATH [--repeat N] [--real-time] [--profile FILE]
+"""
+import argparse
+import asyncio
+import cProfile
+import time
+
+from benchmarks.cycle import reset_state  # also fills in the configuration the bot needs
+from api.recording import Replayer, load_cycles
+from src.steam import functions
+from utils.datetime import DateUtils
+
+async def replay(cycles, args):
+    replayer = functions.steam_client.replayer = Replayer()
+    totals = {'wall': 0.0, 'cpu': 0.0, 'found': 0}
+    for cycle in cycles:
+        replayer.use(cycle)
+        served, misses = replayer.served, replayer.misses
+        if not args.real_time:
+            DateUtils.clock = lambda: cycle.started
+        wall, cpu = time.perf_counter(), time.process_time()
+        await functions.refresh_user_summaries(cycle.summary_users, max_age=0)
+        achievements = await functions.get_all_achievements(cycle.users)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        totals['wall'] += wall
+        totals['cpu'] += cpu
+        totals['found'] += len(achievements)
+        print(f"{cycle.path.name:48} {len(cycle.users):>5} {wall:>8.3f} {cpu:>8.3f} "
+              f"{replayer.served - served:>6} {replayer.misses - misses:>6} {len(achievements):>6}")
+    return totals
+
+async def main_async(args):
+    cycles = load_cycles(args.path)
+    if not cycles:
+        raise SystemExit(f"No recordings found in {args.path}")
+    profiler = cProfile.Profile() if args.profile else None
+    for run in range(args.repeat):
+        reset_state()
+        print(f"{'cycle':48} {'users':>5} {'wall s':>8} {'cpu s':>8} {'reqs':>6} {'misses':>6} {'found':>6}")
+        if profiler:
+            profiler.enable()
+        totals = await replay(cycles, args)
+        if profiler:
+            profiler.disable()
+        print(f"run {run + 1}: {len(cycles)} cycles, {totals['wall']:.3f}s wall, {totals['cpu']:.3f}s cpu, {totals['found']} unlocks\n")
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='recording archive or directory of archives')
+    parser.add_argument('--repeat', type=int, default=1, help='replay all cycles this many times (state is reset in between)')
+    parser.add_argument('--real-time', action='store_true', help="use the real clock instead of each cycle's recorded time")
+    parser.add_argument('--profile', metavar='FILE', help='write cProfile stats of the replay to FILE')
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,30 @@ DISCORD_SERVER_ID = os.getenv("DISCORD_SERVER_ID")
 DISCORD_TOKEN = os.environ["DISCORD_TOKEN"]
 
 # Steam
-STEAM_API_KEY = (os.getenv("STEAM_API_KEY") or "").split(',')
-STEAM_ID = (os.getenv("STEAM_ID") or "").split(',')
-STEAM_API_URL = "https://api.steampowered.com"
+# API keys form one pool shared by all users; any number of keys can serve any number of users
+STEAM_API_KEY = [key.strip() for key in (os.getenv("STEAM_API_KEY") or "").split(',') if key.strip()]
+STEAM_ID = [steam_id.strip() for steam_id in (os.getenv("STEAM_ID") or "").split(',') if steam_id.strip()]
+STEAM_API_URL = os.getenv("STEAM_API_URL") or "https://api.steampowered.com" # Override to point the bot at a local fake API (benchmarks)
+STEAM_MAX_CONCURRENCY = int(os.getenv("STEAM_MAX_CONCURRENCY") or 16) # Max in-flight Steam requests overall
+STEAM_MAX_CONCURRENCY_PER_KEY = int(os.getenv("STEAM_MAX_CONCURRENCY_PER_KEY") or 4) # Max in-flight Steam requests per API key
+STEAM_REQUESTS_PER_DAY = int(os.getenv("STEAM_REQUESTS_PER_DAY") or 95000) # Sustained request budget per API key (Steam allows ~100k/day)
+STEAM_BURST = int(os.getenv("STEAM_BURST") or 25) # Requests per API key that may go out at once before pacing kicks in
+STEAM_MAX_RETRIES = int(os.getenv("STEAM_MAX_RETRIES") or 3) # Retries for 429/5xx/connection errors, with exponential backoff
+STEAM_BREAKER_THRESHOLD = int(os.getenv("STEAM_BREAKER_THRESHOLD") or 5) # Consecutive 5xx/connection failures before an endpoint is paused
+STEAM_BREAKER_RESET_SECONDS = int(os.getenv("STEAM_BREAKER_RESET_SECONDS") or 60) # How long a paused endpoint waits before one probe request
+STEAM_RECORD_DIR = os.getenv("STEAM_RECORD_DIR") or None # Record each cycle's Steam traffic to gzip archives here (replay with benchmarks.replay)
+
+# Caches
+SCHEMA_CACHE_PATH = "src/steam/data/schema_cache.json"
+STATE_DB_PATH = "src/steam/data/state.db" # Delivered notifications, completed games and snapshots (SQLite)
+SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv("SCHEMA_CACHE_MAX_ENTRIES") or 500) # Max number of cached game schemas (per language)
+SCHEMA_CACHE_TTL_HOURS = int(os.getenv("SCHEMA_CACHE_TTL_HOURS") or 168) # How long a cached game schema stays valid
+NEGATIVE_CACHE_PATH = "src/steam/data/negative_cache.json"
+NEGATIVE_CACHE_MINUTES = int(os.getenv("NEGATIVE_CACHE_MINUTES") or 60) # First backoff for apps Steam has no achievement data for, doubled on every repeat
+NEGATIVE_CACHE_MAX_HOURS = int(os.getenv("NEGATIVE_CACHE_MAX_HOURS") or 168) # Longest such an app is skipped before it is tried again
+
+# Colors
+COLOR_MAX_PIXELS = int(os.getenv("COLOR_MAX_PIXELS") or 0) # Downsample icons to this many pixels before picking the embed color (0 = exact)
 
 # Tasks
 ACHIEVEMENT_TIME = int(os.getenv("ACHIEVEMENT_TIME")) # The time in minutes to check for new achievements
@@ -19,5 +40,17 @@ PLATINUM_CHANNEL = int(os.getenv("PLATINUM_CHANNEL")) # The channel to send the
 PLATINUM_ICON = "https://i.imgur.com/i4GXkrq.png"
 INTERVAL_MINUTES = int(os.getenv("INTERVAL_MINUTES")) # The interval in minutes to check for new achievements
 
+# Polling schedule: in-game/active users every POLL_MIN_MINUTES, online users every INTERVAL_MINUTES,
+# offline users back off up to POLL_MAX_MINUTES. POLL_REQUEST_BUDGET caps Steam requests per minute.
+POLL_MIN_MINUTES = int(os.getenv("POLL_MIN_MINUTES") or min(2, INTERVAL_MINUTES))
+POLL_MAX_MINUTES = int(os.getenv("POLL_MAX_MINUTES") or max(60, INTERVAL_MINUTES))
+POLL_REQUEST_BUDGET = int(os.getenv("POLL_REQUEST_BUDGET") or 0) # 0 = derived from STEAM_REQUESTS_PER_DAY and the number of keys
+REORDER_WINDOW_SECONDS = float(os.getenv("REORDER_WINDOW_SECONDS") or 2) # Longest an unlock waits for slower users so notifications stay in unlock order
+SHARDS = int(os.getenv("SHARDS") or 1) # Worker processes polling Steam, each for a share of STEAM_ID (1 = poll in the bot process)
+
+# Metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0) # Serve Prometheus metrics on http://127.0.0.1:METRICS_PORT/metrics (0 = off)
+
 # Delay
-ENABLE_DELAY = os.getenv("ENABLE_DELAY") == "True"
\ No newline at end of file
+ENABLE_DELAY = os.getenv("ENABLE_DELAY") == "True"
+WARMUP_MAX_REQUESTS = int(os.getenv("WARMUP_MAX_REQUESTS") or 2000) # Steam requests the ENABLE_DELAY wait may spend filling caches (0 = no warm-up)
\ No newline at end of file
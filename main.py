@@ -2,14 +2,25 @@ import asyncio
 
 from src.discord.bot import DiscordBot
 
-from config.globals import DISCORD_TOKEN
+from config.globals import DISCORD_TOKEN, METRICS_PORT
+from utils.http import close_session
+from utils.image import shutdown_process_pool
+from utils.metrics import start_metrics_server
 
 async def main():
     discord_bot = DiscordBot(DISCORD_TOKEN)
+    metrics_runner = await start_metrics_server(METRICS_PORT) if METRICS_PORT else None
 
-    await asyncio.gather(
-        discord_bot.start()
-    )
+    try:
+        await asyncio.gather(
+            discord_bot.start()
+        )
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        # Release the shared Steam/HTTP connection pool and the color workers
+        await close_session()
+        shutdown_process_pool()
 
 if __name__ == "__main__":
     try:
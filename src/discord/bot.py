@@ -2,7 +2,7 @@ import discord
 from discord.ext import commands
 import asyncio
 
-from config.globals import ENABLE_DELAY
+from config.globals import ENABLE_DELAY, STEAM_ID, WARMUP_MAX_REQUESTS
 from utils.datetime import DateUtils
 from utils.custom_logger import logger
 
@@ -45,9 +45,25 @@ class DiscordBot:
             minutes_until_next_hour, seconds_remaining = divmod(seconds_until_next_hour, 60)
             # Print the minutes and seconds until the next 00th minute
             logger.info(f'Waiting for {minutes_until_next_hour} minutes and {seconds_remaining} seconds before starting task...')
+            # Use the wait to fill the caches, so the first cycle runs as fast as later ones
+            warm_up = asyncio.create_task(self.warm_up(seconds_until_next_hour))
             # Wait until the next 00th minute
             await asyncio.sleep(seconds_until_next_hour)
+            warm_up.cancel()
 
         # Load the tasks cog
         logger.info('Loading tasks cog')
-        await self.bot.load_extension('src.discord.cogs.tasks')
\ No newline at end of file
+        await self.bot.load_extension('src.discord.cogs.tasks')
+
+    ## Prefetch what the first cycle needs while waiting for the next 00th minute
+    async def warm_up(self, seconds):
+        if not WARMUP_MAX_REQUESTS:
+            return
+        # Imported here: loading the Steam side sets up the client and its caches
+        from src.steam.functions import warm_up
+        try:
+            await warm_up(STEAM_ID, WARMUP_MAX_REQUESTS, starts_in=seconds)
+        except asyncio.CancelledError:
+            logger.info('Warm-up did not finish before the first cycle')
+        except Exception as e:
+            logger.error(f"Error warming up caches: {e}")
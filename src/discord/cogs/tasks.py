@@ -1,57 +1,221 @@
 from discord.ext import tasks, commands
-from datetime import datetime
 import asyncio
+import time
 
-from src.steam.functions import get_all_achievements, create_and_send_embed, create_and_send_completion_embed
-from config.globals import STEAM_API_KEY, ACHIEVEMENT_CHANNEL, PLATINUM_CHANNEL, STEAM_ID, INTERVAL_MINUTES
+from src.discord.delivery import DeliveryQueue, ReorderBuffer
+from src.steam.shard import ShardSupervisor
+from src.steam.functions import (
+    create_achievement_embed, create_completion_embed, prefetch_embed_colors, save_caches, flush_caches,
+    create_scheduler, poll_due_users, restore_state, commit_state, achievement_delivery_key, achievement_order, state_store,
+    requeue_achievement,
+)
+from config.globals import ACHIEVEMENT_CHANNEL, PLATINUM_CHANNEL, STEAM_ID, POLL_MIN_MINUTES, SHARDS, REORDER_WINDOW_SECONDS
 from utils.custom_logger import logger
+from utils.metrics import metrics
 
 class TasksCog(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.completed_games = state_store.completed_games()  # (steam_id, appid) already announced
+        self.delivery_queues = {}  # channel id -> DeliveryQueue
+        self.supervisor = None
+        self.shard_consumer = None
+        if SHARDS > 1:
+            # Worker processes poll; this process only delivers
+            self.supervisor = ShardSupervisor(STEAM_ID, SHARDS)
+            self.shard_consumer = asyncio.create_task(self.consume_shards())
+            return
+        restore_state()
+        self.scheduler = create_scheduler(STEAM_ID)
         # Start the task only if it's not already running (prevents duplicate loops on reloads)
         if not self.process_achievements.is_running():
             self.process_achievements.start()
-        self.completed_games = set()  # Initialize a set to track completed games
 
-    @tasks.loop(minutes=INTERVAL_MINUTES)
+    def get_delivery_queue(self, channel_id):
+        queue = self.delivery_queues.get(channel_id)
+        if queue is None:
+            queue = self.delivery_queues[channel_id] = DeliveryQueue(self.bot.get_channel(channel_id))
+        return queue
+
+    @tasks.loop(minutes=POLL_MIN_MINUTES)
     async def process_achievements(self):
-        logger.info("Searching for Steam Achievements...")
-        user_ids = STEAM_ID
-        api_keys = STEAM_API_KEY
-        channel = self.bot.get_channel(ACHIEVEMENT_CHANNEL)
-        all_achievements = await get_all_achievements(user_ids, api_keys)
-        # Sort by unlock time, then by progress (current/total). Protect against division by zero.
-        def sort_key(a):
-            unlock = datetime.strptime(a[1].unlocktime, "%d/%m/%y %H:%M:%S")
-            total = a[4] if len(a) > 4 else 0
-            current = a[5] if len(a) > 5 else 0
-            progress = (current / total) if total else 0
-            return (unlock, progress)
-
-        all_achievements.sort(key=sort_key, reverse=False)
+        with metrics.timer('cycle_seconds'):
+            await self.poll_and_deliver(lambda on_user: poll_due_users(self.scheduler, STEAM_ID, on_user))
+        commit_state()
+        await flush_caches()
+
+    async def consume_shards(self):
+        """Deliver the unlocks found by the shard workers and confirm each batch once it is sent"""
+        await self.bot.wait_until_ready()
+        self.supervisor.start()
+        async for batches in self.supervisor.batches():
+            # A worker that restarted before its ack re-sends what it found; `deliver` skips what went out already
+            all_achievements = [achievement for _, _, achievements in batches for achievement in achievements]
+            try:
+                failed = await self.deliver(all_achievements)
+            except Exception as e:
+                # No ack: the workers roll back and find these unlocks again
+                logger.error(f"Error delivering shard results: {e}")
+                continue
+            # Save what did go out, so it isn't sent twice when the workers find it again
+            if not commit_state():
+                continue
+            await flush_caches()
+            for shard, batch_id, achievements in batches:
+                # A batch with unsent notifications isn't confirmed: its worker rolls back and retries it
+                if not any(achievement_delivery_key(achievement) in failed for achievement in achievements):
+                    self.supervisor.ack(shard, batch_id)
+
+    async def poll_and_deliver(self, poll):
+        """Run `poll(on_user)` and deliver each user's unlocks while the other users are still polled.
+
+        Results go through a `ReorderBuffer`, so notifications stay in unlock order
+        unless a slow user holds them up for more than REORDER_WINDOW_SECONDS.
+        Returns what `poll` returns.
+        """
+        buffer = ReorderBuffer(REORDER_WINDOW_SECONDS, achievement_order)
+        delivering = asyncio.create_task(self.deliver_batches(buffer.batches(), started=time.perf_counter()))
+        try:
+            return await poll(buffer.put)
+        finally:
+            buffer.close()
+            await delivering
+            if buffer.late:
+                logger.debug(f"{buffer.late} unlock(s) arrived after the reorder window and were sent out of order")
+
+    async def deliver(self, all_achievements):
+        """Send the embeds of already collected achievements (e.g. from the shard workers), in order.
+
+        Returns the delivery keys that could not be sent, like `deliver_batches`.
+        """
+        async def single_batch():
+            yield sorted(all_achievements, key=achievement_order)
+        return await self.deliver_batches(single_batch())
+
+    async def deliver_batches(self, batches, started=None):
+        """Send achievement embeds (plus platinum embeds for completions) for each ordered batch as it comes.
+
+        Achievements delivered before (by an earlier run, or a shard that re-sent them) are
+        skipped. Once the channels are done, the ones that were sent are marked delivered
+        (and completions completed), to be saved by the next `commit_state`; the ones that
+        failed are requeued to be found again next cycle. Returns the delivery keys that failed.
+        With `started` (a perf_counter time) the delay until the first embed is queued is recorded.
+        """
+        achievement_queue = self.get_delivery_queue(ACHIEVEMENT_CHANNEL)
+        platinum_queue = self.get_delivery_queue(PLATINUM_CHANNEL)
+        seen = set()  # delivery keys seen this cycle
+        queued = []  # (key, achievement, future) per achievement embed
+        completions = {}  # (steam_id, appid) -> (key, achievement, future) per platinum embed
         logged_users = set()  # Set to keep track of users that have already been logged
         latest_unlocktimes = {}  # Dictionary to track the latest unlocktime for each user-game combination
+        color_seconds = 0.0
+
+        async for batch in batches:
+            keys = {}
+            for achievement in batch:
+                key = achievement_delivery_key(achievement)
+                if key not in seen:
+                    keys.setdefault(key, achievement)
+            seen.update(keys)
+            delivered = state_store.delivered(keys)
+            # An unlock delivered before still completes its game if the platinum embed didn't go out then
+            batch = [(key, achievement) for key, achievement in keys.items()
+                     if key not in delivered or (achievement[5] == achievement[4]
+                                                 and (achievement[3].steam_id, achievement[2].appid) not in self.completed_games)]
+            if not batch:
+                continue
+            # Download and analyse this batch's icon colors up front, concurrently
+            color_started = time.perf_counter()
+            await prefetch_embed_colors([achievement for _, achievement in batch])
+            color_seconds += time.perf_counter() - color_started
+
+            for key, achievement in batch:
+                game_achievement, user_achievement, user_game, user, total_achievements, current_count = achievement
+                # Update the latest unlocktime
+                completion_key = (user.steam_id, user_game.appid)
+                latest_unlocktime = user_achievement.unlocktime
+                if completion_key not in latest_unlocktimes or latest_unlocktime > latest_unlocktimes[completion_key]:
+                    latest_unlocktimes[completion_key] = latest_unlocktime
+
+                if key not in delivered:
+                    if user.summary.personaname not in logged_users:
+                        logger.info(f"Found achievements for {user.summary.personaname}")
+                        logged_users.add(user.summary.personaname)
+                    embed = await create_achievement_embed(game_achievement, user_achievement, user_game, user, total_achievements, current_count)
+                    queued.append((key, achievement, achievement_queue.put(embed)))
+                    if started is not None:
+                        metrics.observe('first_notification_seconds', time.perf_counter() - started)
+                        started = None
 
-        for game_achievement, user_achievement, user_game, user, total_achievements, current_count in all_achievements:
-            if user.summary.personaname not in logged_users:
-                logger.info(f"Found achievements for {user.summary.personaname}")
-                logged_users.add(user.summary.personaname)
-            await create_and_send_embed(channel, game_achievement, user_achievement, user_game, user, total_achievements, current_count)
-            
-            # Update the latest unlocktime
-            completion_key = (user.summary.personaname, user_game.appid)
-            latest_unlocktime = datetime.strptime(user_achievement.unlocktime, "%d/%m/%y %H:%M:%S")
-            if completion_key not in latest_unlocktimes or latest_unlocktime > latest_unlocktimes[completion_key]:
-                latest_unlocktimes[completion_key] = latest_unlocktime
-            
-            if current_count == total_achievements and completion_key not in self.completed_games:
-                completion_channel = self.bot.get_channel(PLATINUM_CHANNEL)
-                # Retrieve the latest unlocktime for this user-game combination
-                latest_unlocktime = latest_unlocktimes[completion_key].strftime("%d/%m/%y %H:%M:%S")
-                await create_and_send_completion_embed(completion_channel, user_game, user, total_achievements, latest_unlocktime)
+                if current_count == total_achievements and completion_key not in self.completed_games and completion_key not in completions:
+                    # Retrieve the latest unlocktime for this user-game combination
+                    latest_unlocktime = latest_unlocktimes[completion_key]
+                    embed = await create_completion_embed(user_game, user, total_achievements, latest_unlocktime)
+                    completions[completion_key] = (key, achievement, platinum_queue.put(embed))
+
+        metrics.observe('cycle_stage_seconds', color_seconds, stage='color')
+        # Both channels deliver independently; wait for them before the next cycle
+        with metrics.timer('cycle_stage_seconds', stage='send'):
+            await asyncio.gather(achievement_queue.join(), platinum_queue.join())
+
+        failed = set()
+        state_store.mark_delivered(key for key, _, sent in queued if sent.result())
+        for completion_key, (key, _, sent) in completions.items():
+            if sent.result():
                 self.completed_games.add(completion_key)  # Mark this game as completed for this user
-            await asyncio.sleep(1)
+                state_store.mark_completed(*completion_key)
+            else:
+                failed.add(key)
+        failed.update(key for key, _, sent in queued if not sent.result())
+        if failed:
+            logger.warning(f"{len(failed)} notification(s) could not be sent, they are retried next cycle")
+            for key, achievement, _ in queued + list(completions.values()):
+                if key in failed:
+                    requeue_achievement(achievement)
+        return failed
+
+    @commands.command(name='metrics')
+    async def metrics_summary(self, ctx):
+        """Summarise cycle timings, Steam API latency and cache hit rates"""
+        metrics.collect()
+        lines = []
+        cycle = metrics.histogram('cycle_seconds')
+        if cycle is not None:
+            lines.append(f"Cycles: {cycle.count}, last {cycle.last:.1f}s, avg {cycle.sum / cycle.count:.1f}s")
+        stages = []
+        for stage in ('fetch', 'color', 'send'):
+            histogram = metrics.histogram('cycle_stage_seconds', stage=stage)
+            if histogram is not None:
+                stages.append(f"{stage} {histogram.last:.2f}s")
+        first = metrics.histogram('first_notification_seconds')
+        if first is not None:
+            stages.append(f"first notification after {first.last:.2f}s")
+        if stages:
+            lines.append("Last stages: " + ", ".join(stages))
+        for (name, labels), histogram in sorted(metrics.histograms.items()):
+            if name == 'steam_request_seconds':
+                endpoint = dict(labels)['endpoint']
+                errors = metrics.counters.get(('steam_request_errors_total', labels), 0)
+                lines.append(f"{endpoint}: {histogram.count} calls, avg {histogram.sum / histogram.count * 1000:.0f}ms, "
+                             f"p95 <= {histogram.quantile(0.95) * 1000:.0f}ms, {errors} errors")
+        for (name, labels), ratio in sorted(metrics.gauges.items()):
+            if name == 'cache_hit_ratio':
+                lines.append(f"{dict(labels)['cache']} cache: {ratio:.0%} hits, {metrics.gauges[('cache_entries', labels)]} entries")
+        send = metrics.histogram('discord_send_seconds')
+        if send is not None:
+            lines.append(f"Discord sends: {send.count}, avg {send.sum / send.count * 1000:.0f}ms")
+        await ctx.send("```\n" + ("\n".join(lines) or "No cycles yet") + "\n```")
+
+    async def cog_unload(self):
+        self.process_achievements.cancel()
+        if self.supervisor is not None:
+            self.shard_consumer.cancel()
+            await asyncio.to_thread(self.supervisor.stop)
+        for queue in self.delivery_queues.values():
+            await queue.close()
+        commit_state()
+        save_caches()
+        state_store.close()
 
     @process_achievements.before_loop
     async def before_process_achievements(self):
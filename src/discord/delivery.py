@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import time
+
+from utils.custom_logger import logger
+from utils.metrics import metrics
+
+# Discord allows up to 10 embeds and 6000 characters of embed text per message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+class DeliveryQueue:
+    """Delivers embeds to one channel in order, packing queued embeds into as few messages as possible.
+
+    There is no fixed delay between messages: discord.py already tracks the
+    X-RateLimit-* headers of every response and waits only when a bucket is empty.
+    Each channel gets its own queue and worker, so a slow channel never holds up another.
+    `put` returns a future that resolves to whether the embed's message was sent.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._queue = asyncio.Queue()
+        self._carry = None  # embed that didn't fit in the previous message
+        self._worker = None
+
+    def put(self, embed):
+        sent = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((embed, sent))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return sent
+
+    async def join(self):
+        """Wait until every queued embed has been sent (or failed)"""
+        await self._queue.join()
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _next_batch(self):
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+        batch = [first]
+        size = len(first[0])
+        while len(batch) < MAX_EMBEDS_PER_MESSAGE and not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if size + len(entry[0]) > MAX_EMBED_CHARS_PER_MESSAGE:
+                # Too big for this message, it starts the next one
+                self._carry = entry
+                break
+            batch.append(entry)
+            size += len(entry[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            started = time.perf_counter()
+            sent = False
+            try:
+                await self.channel.send(embeds=[embed for embed, _ in batch])
+                sent = True
+                metrics.observe('discord_send_seconds', time.perf_counter() - started)
+                metrics.inc('discord_embeds_sent_total', len(batch))
+            except Exception as e:
+                metrics.inc('discord_send_errors_total')
+                logger.error(f"Error sending {len(batch)} embed(s) to channel {getattr(self.channel, 'id', self.channel)}: {e}")
+            finally:
+                for _, result in batch:
+                    if not result.done():
+                        result.set_result(sent)
+                    self._queue.task_done()
+
+class ReorderBuffer:
+    """Merge stage between the per-user fetches and delivery.
+
+    Users' results are `put` as each user finishes and come out of `batches()` in
+    `key` order. Fetches finish in any order, so an item is held back until the
+    buffer is closed (every user is done and nothing earlier can show up) or it
+    has waited `window` seconds; in that case everything ordered before it goes
+    out too. A window of 0 delivers each user's results as soon as they arrive.
+    """
+
+    def __init__(self, window, key):
+        self.window = window
+        self.key = key
+        self._heap = []  # (key, sequence, arrived, item)
+        self._sequence = 0
+        self._closed = False
+        self._changed = asyncio.Event()
+        self._last_key = None
+        self.late = 0  # items that arrived after something ordered after them was emitted
+
+    def put(self, items):
+        arrived = time.monotonic()
+        for item in items:
+            heapq.heappush(self._heap, (self.key(item), self._sequence, arrived, item))
+            self._sequence += 1
+        self._changed.set()
+
+    def close(self):
+        self._closed = True
+        self._changed.set()
+
+    def _pop_ready(self):
+        if self._closed:
+            cutoff = None
+        else:
+            expired = time.monotonic() - self.window
+            overdue = [entry[0] for entry in self._heap if entry[2] <= expired]
+            if not overdue:
+                return []
+            cutoff = max(overdue)
+        ready = []
+        while self._heap and (cutoff is None or self._heap[0][0] <= cutoff):
+            key, _, _, item = heapq.heappop(self._heap)
+            if self._last_key is not None and key < self._last_key:
+                self.late += 1
+            else:
+                self._last_key = key
+            ready.append(item)
+        return ready
+
+    def _timeout(self):
+        """Seconds until the oldest held item is due, None while empty"""
+        if not self._heap:
+            return None
+        return max(0.0, min(entry[2] for entry in self._heap) + self.window - time.monotonic())
+
+    async def batches(self):
+        """Yield lists of items as they become ready, in order, until closed and drained"""
+        while True:
+            self._changed.clear()
+            ready = self._pop_ready()
+            if ready:
+                yield ready
+                continue
+            if self._closed:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), self._timeout())
+            except asyncio.TimeoutError:
+                pass
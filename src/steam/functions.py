@@ -1,119 +1,353 @@
-from datetime import datetime, timedelta
+import asyncio
 
 import discord
-from api.client import SteamClient
-from config.globals import ACHIEVEMENT_TIME, PLATINUM_ICON
+from api.cache import NegativeCache, SchemaCache
+from api.client import AsyncSteamClient
+from api.errors import NoStats
+from api.keypool import KeyPool
+from api.ratelimit import CircuitOpen
+from api.recording import Recorder
+from api.users import Users, MAX_SUMMARIES_PER_REQUEST
+from config.globals import (
+    ACHIEVEMENT_TIME, PLATINUM_ICON, STEAM_API_KEY, STEAM_MAX_CONCURRENCY, STEAM_MAX_CONCURRENCY_PER_KEY,
+    STEAM_REQUESTS_PER_DAY, STEAM_BURST, STEAM_MAX_RETRIES, STEAM_API_URL, STEAM_RECORD_DIR,
+    STEAM_BREAKER_THRESHOLD, STEAM_BREAKER_RESET_SECONDS, NEGATIVE_CACHE_PATH, NEGATIVE_CACHE_MINUTES, NEGATIVE_CACHE_MAX_HOURS,
+    INTERVAL_MINUTES, POLL_MIN_MINUTES, POLL_MAX_MINUTES, POLL_REQUEST_BUDGET,
+    SCHEMA_CACHE_PATH, STATE_DB_PATH, SCHEMA_CACHE_MAX_ENTRIES, SCHEMA_CACHE_TTL_HOURS, COLOR_MAX_PIXELS,
+)
 from src.discord.embed import EmbedBuilder
-from utils.image import get_discord_color
+from src.steam.scheduler import PollScheduler
+from src.steam.snapshots import AchievementSnapshots, PlaytimeSnapshots
+from src.steam.state import StateStore, delivery_key
+from utils.cache import LRUCache
+from utils.image import get_discord_color, prefetch_colors, color_cache
+from utils.metrics import metrics
 from utils.datetime import DateUtils
 from utils.custom_logger import logger
 
-DATE_FORMAT = '%d/%m/%y %H:%M:%S'
-
 # Scraping from steamhunters has been removed (site now blocks scraping).
 # The data-dependent helpers were deleted. Keep a small store for runtime counts.
 user_current_counts = {}
 
-async def get_user_games(user_id, api_key):
-    client = SteamClient(api_key)
+# Achieved-state bitsets of every (user, game) seen so far, used to detect new unlocks
+achievement_snapshots = AchievementSnapshots()
+# Playtime/last-played per user and game, used to skip games not played since the last cycle
+playtime_snapshots = PlaytimeSnapshots()
+# Whether each user had games to check in their latest poll (used by the poll scheduler)
+user_activity = {}
+
+# Delivered notifications, completed games and the snapshots above, kept across restarts
+state_store = StateStore(STATE_DB_PATH)
+
+# Game schemas shared by every client, kept across cycles and restarts
+schema_cache = SchemaCache(max_entries=SCHEMA_CACHE_MAX_ENTRIES, ttl=SCHEMA_CACHE_TTL_HOURS * 3600, path=SCHEMA_CACHE_PATH)
+schema_cache.load()
+
+# Apps (and users' apps) without achievement data, skipped with a growing backoff
+negative_cache = NegativeCache(NEGATIVE_CACHE_MINUTES * 60, NEGATIVE_CACHE_MAX_HOURS * 3600, path=NEGATIVE_CACHE_PATH)
+negative_cache.load()
+
+# appid -> (schema version, schema size, player list size) that a refetch didn't reconcile
+schema_mismatches = {}
+
+# Player summaries (name, avatar, what they are playing) of all tracked users, fetched in
+# batches of 100. Every scheduler tick refreshes them to see who started playing, so
+# they never need to expire.
+summary_cache = LRUCache(max_entries=10000)
+# A tick reuses summaries fetched less than half a tick ago (by the warm-up) instead of asking again
+SUMMARY_MAX_AGE = POLL_MIN_MINUTES * 30
+
+# One long-lived client for every user; requests are spread over all configured API keys
+# and share the same HTTP connection pool
+AsyncSteamClient.set_global_concurrency(STEAM_MAX_CONCURRENCY)
+steam_client = AsyncSteamClient(
+    KeyPool(STEAM_API_KEY, STEAM_REQUESTS_PER_DAY, STEAM_BURST, STEAM_MAX_CONCURRENCY_PER_KEY),
+    schema_cache=schema_cache,
+    max_retries=STEAM_MAX_RETRIES,
+    base_url=STEAM_API_URL,
+    breaker_threshold=STEAM_BREAKER_THRESHOLD,
+    breaker_reset=STEAM_BREAKER_RESET_SECONDS,
+)
+if STEAM_RECORD_DIR:
+    steam_client.recorder = Recorder(STEAM_RECORD_DIR)
+
+def get_client_stats():
+    """Request budget and throttling per API key"""
+    return steam_client.stats()
+
+def get_request_count():
+    """Total Steam requests made so far, over all keys"""
+    return sum(stats['requests'] for stats in get_client_stats())
+
+def set_request_share(share):
+    """Give this process only `share` of every key's budget (when several processes share the keys)"""
+    steam_client.keys = KeyPool(
+        STEAM_API_KEY,
+        max(1, int(STEAM_REQUESTS_PER_DAY * share)),
+        max(1, int(STEAM_BURST * share)),
+        STEAM_MAX_CONCURRENCY_PER_KEY,
+    )
+
+def create_scheduler(user_ids, share=1.0):
+    """Poll scheduler for `user_ids`, using `share` of the overall request budget"""
+    # Requests per minute the keys can sustain, unless configured explicitly
+    request_budget = POLL_REQUEST_BUDGET or max(1, len(STEAM_API_KEY) * STEAM_REQUESTS_PER_DAY // 1440)
+    return PollScheduler(
+        user_ids,
+        min_interval=POLL_MIN_MINUTES * 60,
+        base_interval=INTERVAL_MINUTES * 60,
+        max_interval=POLL_MAX_MINUTES * 60,
+        request_budget=max(1, request_budget * share) * POLL_MIN_MINUTES,
+    )
+
+def collect_metrics(metrics):
+    """Copy cache and API key state into gauges before /metrics is rendered"""
+    for name, cache in (('schema', schema_cache), ('color', color_cache), ('summary', summary_cache), ('negative', negative_cache)):
+        lookups = cache.hits + cache.misses
+        metrics.set('cache_entries', len(cache), cache=name)
+        metrics.set('cache_hits', cache.hits, cache=name)
+        metrics.set('cache_misses', cache.misses, cache=name)
+        metrics.set('cache_hit_ratio', round(cache.hits / lookups, 4) if lookups else 0, cache=name)
+    for stats in get_client_stats():
+        metrics.set('steam_key_remaining_tokens', stats['remaining'], key=stats['key'])
+    for endpoint, stats in steam_client.breaker_stats().items():
+        metrics.set('steam_circuit_open', int(stats['state'] != 'closed'), endpoint=endpoint)
+
+metrics.on_collect(collect_metrics)
+metrics.describe('cycle_seconds', 'Duration of a whole poll-and-deliver cycle')
+metrics.describe('cycle_stage_seconds', 'Duration of each cycle stage (fetch, color, send)')
+metrics.describe('achievement_match_seconds', 'Time spent matching one game\'s achievements against its schema')
+metrics.describe('first_notification_seconds', 'Time from the start of a cycle until its first notification is queued')
+metrics.describe('steam_request_seconds', 'Latency of successful Steam API requests')
+metrics.describe('steam_requests_total', 'Steam API responses by status')
+metrics.describe('steam_request_errors_total', 'Steam API requests that failed for good')
+metrics.describe('steam_requests_coalesced_total', 'Steam API requests answered by an identical request already in flight')
+metrics.describe('steam_circuit_rejected_total', 'Steam API requests not made because the endpoint\'s circuit breaker was open')
+metrics.describe('discord_send_seconds', 'Latency of Discord message sends')
+
+def restore_state():
+    """Replace the in-memory snapshots with the last committed ones"""
+    global achievement_snapshots, playtime_snapshots
+    achievements, playtimes = AchievementSnapshots(), PlaytimeSnapshots()
+    try:
+        state_store.load_snapshots(achievements, playtimes)
+    except Exception as e:
+        logger.error(f"Error loading bot state: {e}")
+    achievement_snapshots, playtime_snapshots = achievements, playtimes
+    logger.info(f"Restored {len(achievements)} achievement snapshot(s) for {len(playtimes)} user(s)")
+
+def use_shard_caches(shard):
+    """Give a shard worker its own cache files, so workers don't overwrite each other's.
+
+    The worker starts from the shared files (already loaded) plus whatever it saved
+    itself in an earlier run.
+    """
+    for cache in (schema_cache, negative_cache, color_cache):
+        if cache.path is not None:
+            cache.path = cache.path.with_name(f"{cache.path.stem}.shard{shard}{cache.path.suffix}")
+            cache.load()
+
+def commit_state():
+    """Save what changed this cycle (deliveries, completions, snapshots) in one transaction"""
+    return state_store.commit(achievement_snapshots, playtime_snapshots)
+
+def achievement_delivery_key(achievement):
+    """Delivery key of a (game_achievement, user_achievement, user_game, user, ...) tuple"""
+    return delivery_key(achievement[3].steam_id, achievement[2].appid, achievement[1].apiname)
+
+def requeue_achievement(achievement):
+    """Make an unlock that could not be delivered show up as new again next cycle"""
+    game_achievement, _, user_game, user = achievement[:4]
+    achievement_snapshots.forget_unlock(user.steam_id, user_game.appid, game_achievement.position)
+    playtime_snapshots.mark_stale(user.steam_id, user_game.appid)
+
+def _cache_writers():
+    """(name, write) of every on-disk cache that changed; the entries are copied right away"""
+    writers = []
+    for name, cache in (('schema', schema_cache), ('negative', negative_cache), ('image', color_cache)):
+        write = cache.prepare_save()
+        if write is not None:
+            writers.append((name, write))
+    return writers
+
+def _write_caches(writers):
+    for name, write in writers:
+        try:
+            write()
+        except Exception as e:
+            logger.error(f"Error saving {name} cache: {e}")
+
+def save_caches():
+    """Flush on-disk caches, blocking (on shutdown)"""
+    _write_caches(_cache_writers())
+
+async def flush_caches():
+    """Flush on-disk caches once per cycle; the writing happens in a thread so big schema files don't stall the loop"""
+    writers = _cache_writers()
+    if writers:
+        await asyncio.get_running_loop().run_in_executor(None, _write_caches, writers)
+
+async def refresh_user_summaries(user_ids, client=None, max_age=None):
+    """Fetch summaries of every user without a cached one, or with one at least `max_age` seconds old, 100 per request.
+
+    Returns the users whose summaries were asked for.
+    """
+    client = client or steam_client
+    def stale(user_id):
+        age = summary_cache.age(user_id)
+        return age is None or (max_age is not None and age >= max_age)
+    missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id and stale(user_id)]
+    chunks = [missing[i:i + MAX_SUMMARIES_PER_REQUEST] for i in range(0, len(missing), MAX_SUMMARIES_PER_REQUEST)]
+    results = await asyncio.gather(*(Users.get_player_summaries(client, chunk) for chunk in chunks), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Error fetching player summaries: {result}")
+            continue
+        for steam_id, summary in result.items():
+            summary_cache.set(steam_id, summary)
+    return missing
+
+async def get_user_games(user_id, client):
     user = client.user(user_id)
-    user.get_user_summaries()
-    user.get_owned_games()
+    user.summary = summary_cache.get(user_id)
+    if user.summary is None:
+        # Not covered by the batched fetch, ask for this user alone
+        await asyncio.gather(user.get_user_summaries(), user.get_owned_games())
+        summary_cache.set(user_id, user.summary)
+    else:
+        await user.get_owned_games()
     return user
 
 async def get_recently_played_games(user):
-    current_time = datetime.now().strftime(DATE_FORMAT)
-    recently_played_games = []
+    current_time = DateUtils.now_timestamp()
+    owned_games = getattr(user, 'owned_games', [])
 
-    # Prefer owned games list first (contains last_played timestamps when available)
-    for user_game in getattr(user, 'owned_games', []):
-        if user_game.last_played != "Unknown":
-            try:
-                last_played_date = datetime.strptime(user_game.last_played, DATE_FORMAT)
-                if datetime.strptime(current_time, DATE_FORMAT) - last_played_date <= timedelta(minutes=ACHIEVEMENT_TIME):
-                    recently_played_games.append(user_game)
-            except Exception:
-                # If parsing fails, skip and continue
-                continue
-
-    # Also include results from the recently-played endpoint (covers family-shared games)
+    # Also use the recently-played endpoint (covers family-shared games)
+    recent_games = []
     try:
         if hasattr(user, 'get_recently_played_games'):
-            user.get_recently_played_games()
-            for rp in getattr(user, 'recently_played_games', []):
-                # avoid duplicates by appid
-                if rp.appid not in [g.appid for g in recently_played_games]:
-                    recently_played_games.append(rp)
+            await user.get_recently_played_games()
+            recent_games = getattr(user, 'recently_played_games', [])
     except Exception as e:
         logger.debug(f"Could not fetch recently played games for {getattr(user, 'steam_id', 'unknown')}: {e}")
 
+    # Prefer owned games first (contains last_played timestamps when available), avoid duplicates by appid
+    games = {}
+    for user_game in list(owned_games) + list(recent_games):
+        games.setdefault(user_game.appid, user_game)
+    recent_appids = {rp.appid for rp in recent_games}
+
+    # Games whose playtime or last-played time moved since the previous cycle.
+    # None on the first cycle for this user, then every recently-played game is checked.
+    changed = playtime_snapshots.update(user.steam_id, games.values())
+
+    recently_played_games = []
+    for appid, user_game in games.items():
+        in_window = user_game.last_played is not None and current_time - user_game.last_played <= ACHIEVEMENT_TIME * 60
+        if in_window or (appid in recent_appids if changed is None else appid in changed):
+            recently_played_games.append(user_game)
+
+    user_activity[user.steam_id] = bool(recently_played_games)
     return recently_played_games
 
+def has_no_stats(error):
+    """Whether `error` is Steam saying there is nothing to fetch, rather than a failure worth retrying"""
+    return isinstance(error, NoStats)
+
+def fetch_failed(error, user, user_game, key, what):
+    if has_no_stats(error):
+        delay = negative_cache.add(key)
+        logger.debug(f"No {what} for game {user_game.appid} ({error.status}), skipping it for {delay // 60:.0f} minute(s)")
+        return
+    # Check this game again next cycle even if its playtime doesn't move
+    playtime_snapshots.mark_stale(user.steam_id, user_game.appid)
+    if isinstance(error, CircuitOpen):
+        logger.debug(f"Not fetching {what} for game {user_game.appid}: {error}")
+    else:
+        logger.error(f"Error fetching {what} for game {user_game.appid} of {user.summary and getattr(user.summary, 'personaname', user.steam_id)}: {error}")
+
 async def get_game_achievements(user_game, user, client):
-    game_instance = client.game()
-    try:
-        game_instance.get_game_achievements(user_game.appid)
-    except Exception as e:
-        logger.error(f"Error processing achievements for game {user_game.appid}: {e}")
+    app_key = NegativeCache.app_key(user_game.appid)
+    user_key = NegativeCache.user_key(user.steam_id, user_game.appid)
+    if negative_cache.blocked_any(app_key, user_key):
         return None
 
-    # fetch the user's achievements for this game (synchronous API)
-    try:
-        user.get_user_achievements(user_game.appid)
-    except Exception as e:
-        logger.error(f"Error fetching user achievements for {user.summary and getattr(user.summary, 'personaname', user.steam_id)}: {e}")
+    # Schema and the user's achievements are independent, fetch both at once. Users
+    # playing the same game at the same time share one schema request and `Game`.
+    game_result, user_result = await asyncio.gather(
+        client.get_game(user_game.appid),
+        user.get_user_achievements(user_game.appid),
+        return_exceptions=True,
+    )
+    game_instance = game_result
+    # BaseException: a request cancelled on its own comes back as CancelledError, which is no Exception
+    if isinstance(game_result, BaseException):
+        fetch_failed(game_result, user, user_game, app_key, 'achievement schema')
         return None
+    if isinstance(user_result, BaseException):
+        # Steam refuses player stats of games without achievements, which is about the game, not the user
+        key = app_key if has_no_stats(user_result) and not game_instance.achievements else user_key
+        fetch_failed(user_result, user, user_game, key, 'player achievements')
+        return None
+
+    # Other games of this user may be in flight too, so don't rely on `user.achievements`
+    user_achievements = user.achievements_by_app.get(user_game.appid, [])
+
+    # The player's list always covers every achievement of the game, so a different
+    # count means the cached schema predates a game update: drop it and fetch again.
+    # If a fresh schema still doesn't match, Steam just disagrees with itself; remember
+    # that, so the same schema isn't refetched for every user and cycle.
+    mismatch = (game_instance.gameversion, len(game_instance.achievements), len(user_achievements))
+    if user_achievements and mismatch[1] != mismatch[2] and schema_mismatches.get(user_game.appid) != mismatch:
+        logger.debug(f"Schema for {user_game.appid} is outdated, refetching")
+        schema_cache.invalidate(user_game.appid)
+        try:
+            await game_instance.get_game_achievements(user_game.appid)
+        except Exception as e:
+            fetch_failed(e, user, user_game, app_key, 'achievement schema')
+            return None
+        if len(game_instance.achievements) != len(user_achievements):
+            schema_mismatches[user_game.appid] = (game_instance.gameversion, len(game_instance.achievements), len(user_achievements))
 
     if not game_instance.achievements:
+        # A game without achievements won't get any soon, stop asking every cycle
+        negative_cache.add(app_key)
         return None
 
+    negative_cache.clear(user_key)
+    negative_cache.clear(app_key)
     total_achievements = len(game_instance.achievements)
-    return game_instance.achievements, user.achievements, total_achievements
+    return game_instance, user_achievements, total_achievements
 
-async def find_matching_achievements(user_achievement, game_achievements, current_time, user_game, user):
+async def find_matching_achievements(user_achievement, game, current_time, user_game, user):
     matching_achievements = []
-    for game_achievement in game_achievements:
-        if game_achievement.displayname == user_achievement.name:
-            unlocktime = datetime.strptime(user_achievement.unlocktime, DATE_FORMAT)
-            if unlocktime and datetime.strptime(current_time, DATE_FORMAT) - unlocktime <= timedelta(minutes=ACHIEVEMENT_TIME):
-                matching_achievements.append((game_achievement, user_achievement, user_game, user))
+    game_achievement = game.get_achievement(user_achievement.apiname)
+    if game_achievement is not None:
+        unlocktime = user_achievement.unlocktime
+        if unlocktime and current_time - unlocktime <= ACHIEVEMENT_TIME * 60:
+            matching_achievements.append((game_achievement, user_achievement, user_game, user))
     return matching_achievements
 
-def calculate_completion_time_span(data):
-    # Check if the data structure is as expected and contains 'playerstats' and 'achievements'
-    if isinstance(data, dict) and 'playerstats' in data and \
-       isinstance(data['playerstats'], dict) and 'achievements' in data['playerstats']:
-        user_achievements = data['playerstats']['achievements']
-    else:
-        logger.error("Invalid data format. Expected 'playerstats' and 'achievements' keys.")
-        return None
-
-    unlock_times = []
-    for ua in user_achievements:
-        if isinstance(ua, dict) and 'unlocktime' in ua:
-            try:
-                unlock_time = DateUtils.convert_to_datetime(ua['unlocktime'])
-                unlock_times.append(unlock_time)
-            except ValueError as e:
-                # Assuming ua['name'] exists for logging purposes
-                logger.error(f"Error converting unlocktime for achievement {ua.get('name', 'Unknown')}: {e}")
-        else:
-            # Log an error or handle unexpected data format
-            logger.error(f"Unexpected data format for achievement: {ua}")
-
+def calculate_completion_time_span(user_achievements):
+    """Time between the first and the last unlock of a game, from already fetched `UserAchievement`s"""
+    unlock_times = [ua.unlocktime for ua in user_achievements if ua.achieved == 1 and ua.unlocktime]
     if not unlock_times:
         return None
 
-    first_unlocktime = min(unlock_times)
-    latest_unlocktime = max(unlock_times)
+    first_unlocktime = DateUtils.convert_to_datetime(min(unlock_times))
+    latest_unlocktime = DateUtils.convert_to_datetime(max(unlock_times))
     time_span = DateUtils.calculate_time_span(first_unlocktime, latest_unlocktime)
 
     return DateUtils.format_time_span(time_span)
 
-async def get_recent_achievements(game_achievements, user_achievements, user_game, user):
+async def get_recent_achievements(game, user_achievements, user_game, user):
     if user_achievements is None:
         return []
-    current_time = datetime.now().strftime(DATE_FORMAT)
+    with metrics.timer('achievement_match_seconds'):
+        return await _get_recent_achievements(game, user_achievements, user_game, user)
+
+async def _get_recent_achievements(game, user_achievements, user_game, user):
+    current_time = DateUtils.now_timestamp()
     achievements = []
 
     # Sort the user_achievements list by unlocktime in descending order
@@ -121,9 +355,20 @@ async def get_recent_achievements(game_achievements, user_achievements, user_gam
 
     current_count = len([ua for ua in user_achievements if ua.achieved == 1])
 
+    # New unlocks are the bits that flipped since the last snapshot of this user/game.
+    # Without a usable previous snapshot fall back to the ACHIEVEMENT_TIME window.
+    bits = AchievementSnapshots.bitset(user_achievements, game.index)
+    new_bits = achievement_snapshots.update(user.steam_id, user_game.appid, len(game.achievements), bits)
+
     for user_achievement in user_achievements:
         if user_achievement.achieved == 1:
-            matches = await find_matching_achievements(user_achievement, game_achievements, current_time, user_game, user)
+            if new_bits is None:
+                matches = await find_matching_achievements(user_achievement, game, current_time, user_game, user)
+            else:
+                position = game.index.get(user_achievement.apiname)
+                if position is None or not new_bits >> position & 1:
+                    continue
+                matches = [(game.achievements[position], user_achievement, user_game, user)]
             for match in matches:
                 match += (current_count,)
                 achievements.append(match)
@@ -131,18 +376,126 @@ async def get_recent_achievements(game_achievements, user_achievements, user_gam
 
     return achievements
 
-async def get_all_achievements(user_ids, api_keys):
-    all_achievements = []
-    for user_id, api_key in zip(user_ids, api_keys):
-        achievements = await check_recently_played_games(user_id, api_key)
-        all_achievements.extend(achievements)
-    try:
-        all_achievements.sort(key=lambda pair: datetime.strptime(pair[1].unlocktime, DATE_FORMAT))
-    except Exception as e:
-        logger.warning(f"Could not sort all_achievements: {e}")
-        # leave unsorted if entries are malformed
+async def get_all_achievements(user_ids, on_user=None):
+    """Poll `user_ids` and return every new unlock found.
+
+    `on_user`, if given, is called with each user's unlocks as soon as that user is
+    done, so delivery can start before the slowest user finishes.
+    """
+    await refresh_user_summaries(user_ids, steam_client)
+
+    async def check(user_id):
+        achievements = await check_recently_played_games(user_id)
+        if on_user is not None and achievements:
+            on_user(achievements)
+        return achievements
+
+    # Users are polled concurrently; in-flight requests are bounded globally and per key
+    # by the client's key pool. gather() keeps results in user order and each user catches its own errors.
+    # Delivery orders the unlocks itself, so they are not sorted here.
+    results = await asyncio.gather(*(check(user_id) for user_id in user_ids))
+    all_achievements = [achievement for achievements in results for achievement in achievements]
+    paused = [name for name, stats in steam_client.breaker_stats().items() if stats['state'] != 'closed']
+    if paused:
+        logger.warning(f"Steam keeps failing, paused requests to {', '.join(paused)}; affected users are checked next cycle")
+    for stats in get_client_stats():
+        logger.debug(f"Steam API key stats: {stats}")
     return all_achievements
 
+def achievement_order(achievement):
+    """Delivery order: unlock time, then progress (current/total) for unlocks in the same second"""
+    _, user_achievement, _, _, total, current = achievement
+    return user_achievement.unlocktime, current / total if total else 0
+
+async def prefetch_embed_colors(all_achievements):
+    """Resolve the color of every game icon in this cycle before any embed is sent"""
+    icons = {user_game.game_icon for _, _, user_game, *_ in all_achievements}
+    await prefetch_colors(icons, max_pixels=COLOR_MAX_PIXELS)
+
+async def poll_due_users(scheduler, user_ids, on_user=None):
+    """One scheduler tick: find who is playing, poll the users that are due and reschedule them.
+
+    Returns the achievements found, like `get_all_achievements` (which gets `on_user`).
+    """
+    recorder = steam_client.recorder
+    if recorder is not None:
+        recorder.start_cycle()
+    # One batched summary call per 100 users tells us who just started playing
+    summary_users = await refresh_user_summaries(user_ids, max_age=SUMMARY_MAX_AGE)
+    for steam_id in user_ids:
+        summary = summary_cache.get(steam_id)
+        if summary is not None and summary.gameid:
+            scheduler.promote(steam_id)
+
+    due = scheduler.due_users()
+    if not due:
+        return []
+    logger.info(f"Searching for Steam Achievements for {len(due)} user(s)...")
+    requests_before = get_request_count()
+    try:
+        with metrics.timer('cycle_stage_seconds', stage='fetch'):
+            achievements = await get_all_achievements(due, on_user)
+        metrics.inc('users_polled_total', len(due))
+        metrics.inc('achievements_found_total', len(achievements))
+        return achievements
+    finally:
+        scheduler.record_cost(len(due), get_request_count() - requests_before)
+        for steam_id in due:
+            scheduler.reschedule(steam_id, summary_cache.get(steam_id), user_activity.get(steam_id, False))
+        if recorder is not None:
+            try:
+                # Encoding and compressing a cycle's responses is slow, so it happens in a thread
+                await asyncio.get_running_loop().run_in_executor(None, recorder.prepare_cycle(summary_users, due))
+            except Exception as e:
+                logger.error(f"Error writing Steam recording: {e}")
+
+async def warm_up(user_ids, max_requests, starts_in=0):
+    """Fill the caches for a first cycle `starts_in` seconds from now, spending at most `max_requests` Steam requests.
+
+    Fetches player summaries, then every user's owned and recently played games to
+    find the games the first cycle will check, and loads their schemas and icon
+    colors. Snapshots are left alone: the first cycle still decides what is new
+    from the restored state or the ACHIEVEMENT_TIME window, as without a warm-up.
+    """
+    requests_before = get_request_count()
+    def remaining():
+        return max_requests - (get_request_count() - requests_before)
+
+    await refresh_user_summaries(user_ids)
+    user_ids = list(dict.fromkeys(user_ids))[:max(0, remaining() // 2)]
+
+    async def candidate_games(user_id):
+        user = steam_client.user(user_id)
+        results = await asyncio.gather(user.get_owned_games(), user.get_recently_played_games(), return_exceptions=True)
+        if all(isinstance(result, Exception) for result in results):
+            logger.debug(f"Warm-up could not fetch the games of {user_id}: {results[0]}")
+            return []
+        # Games still inside the ACHIEVEMENT_TIME window when the first cycle runs
+        since = DateUtils.now_timestamp() + starts_in - ACHIEVEMENT_TIME * 60
+        recent = getattr(user, 'recently_played_games', [])
+        owned = [game for game in getattr(user, 'owned_games', []) if game.last_played and game.last_played >= since]
+        return recent + owned
+
+    games = {}
+    for user_games in await asyncio.gather(*(candidate_games(user_id) for user_id in user_ids)):
+        for user_game in user_games:
+            games.setdefault(user_game.appid, user_game)
+    apps = [appid for appid in games
+            if not schema_cache.has_schema(appid) and not negative_cache.blocked(NegativeCache.app_key(appid))]
+    apps = apps[:max(0, remaining())]
+    results = await asyncio.gather(*(steam_client.get_game(appid) for appid in apps), return_exceptions=True)
+    for appid, result in zip(apps, results):
+        if isinstance(result, Exception):
+            if has_no_stats(result):
+                negative_cache.add(NegativeCache.app_key(appid))
+        elif not result.achievements:
+            negative_cache.add(NegativeCache.app_key(appid))
+
+    await prefetch_colors([user_game.game_icon for user_game in games.values()], max_pixels=COLOR_MAX_PIXELS)
+    await flush_caches()
+    logger.info(f"Warm-up done: {len(user_ids)} user(s), {len(games)} recent game(s), {len(apps)} schema(s) fetched, "
+                f"{get_request_count() - requests_before} request(s)")
+
 def create_embed_info(game_achievement, user_achievement, user_game, current_count, total_achievements, user):
     # Steamhunters scraping removed; fall back to basic/default values
     ach_desc = getattr(game_achievement, 'description', '') or ''
@@ -159,36 +512,40 @@ def create_embed_info(game_achievement, user_achievement, user_game, current_cou
     except Exception:
         completion_percentage = 0
 
-    footer = f"{user.summary.personaname} • {user_achievement.unlocktime}"
+    footer = f"{user.summary.personaname} • {DateUtils.format_timestamp(user_achievement.unlocktime)}"
     completion_info = f"{current_count}/{total_achievements} ({completion_percentage:.2f}%)"
 
     return title, description, completion_info, footer
 
 
-async def check_recently_played_games(user_id, api_key):
+async def check_recently_played_games(user_id):
     try:
-        client = SteamClient(api_key)
-        user = await get_user_games(user_id, api_key)
+        client = steam_client
+        user = await get_user_games(user_id, client)
         recently_played_games = await get_recently_played_games(user)
         achievements = []
-        for user_game in recently_played_games:
-            result = await get_game_achievements(user_game, user, client)
+        results = await asyncio.gather(*(get_game_achievements(user_game, user, client) for user_game in recently_played_games))
+        for user_game, result in zip(recently_played_games, results):
             if result is None:
                 continue
-            game_achievement, user_achievement, total_achievements = result
-            recent_achievements = await get_recent_achievements(game_achievement, user_achievement, user_game, user)
+            game, user_achievement, total_achievements = result
+            recent_achievements = await get_recent_achievements(game, user_achievement, user_game, user)
             for ach in recent_achievements:
                 # `ach` is (game_achievement, user_achievement, user_game, user, current_count)
                 # Return tuple as (game_achievement, user_achievement, user_game, user, total_achievements, current_count)
                 ga, ua, ug, u, current_count = ach
                 achievements.append((ga, ua, ug, u, total_achievements, current_count))
         return achievements
+    except CircuitOpen as e:
+        # Steam is down for this endpoint; the breaker already says so once, not once per user
+        logger.debug(f"Skipping user {user_id}: {e}")
+        return []
     except Exception as e:
         logger.error(f"Error processing achievements for user {user_id}: {e}")
         return []
     
-async def create_and_send_embed(channel, game_achievement, user_achievement, user_game, user, total_achievements, current_count):
-    color = await get_discord_color(user_game.game_icon)
+async def create_achievement_embed(game_achievement, user_achievement, user_game, user, total_achievements, current_count):
+    color = await get_discord_color(user_game.game_icon, max_pixels=COLOR_MAX_PIXELS)
     
     # Get information for the embed (title is achievement name)
     title, description, completion_info, footer = create_embed_info(game_achievement, user_achievement, user_game, current_count, total_achievements, user)
@@ -203,18 +560,16 @@ async def create_and_send_embed(channel, game_achievement, user_achievement, use
     embed.add_field(name="Progress", value=completion_info, inline=True)
     embed.set_footer(text=footer, icon_url=user.summary.avatarfull)
     
-    logger.info(f"Sending embed for {user.summary.personaname}: {user_achievement.name} ({user_game.name})")
-    
-    # Send the embed to the channel
-    await embed.send_embed(channel)
+    logger.info(f"Queueing embed for {user.summary.personaname}: {user_achievement.name} ({user_game.name})")
+    return embed.build()
 
-async def create_and_send_completion_embed(completion_channel, user_game, user, total_achievements, latest_unlocktime):
-    color = await get_discord_color(user_game.game_icon)
+async def create_completion_embed(user_game, user, total_achievements, latest_unlocktime):
+    color = await get_discord_color(user_game.game_icon, max_pixels=COLOR_MAX_PIXELS)
     description = f"[{user.summary.personaname}]({user.summary.profileurl}) has completed all {total_achievements} achievements for [{user_game.name}]({user_game.url})!"
     embed = EmbedBuilder(description=description, color=discord.Color(color))
-    # `get_user_achievements` returns the raw API response dict; guard if calculation fails
+    # Reuse the achievements fetched for this game during the cycle, no extra API call
     try:
-        completion_time_span = calculate_completion_time_span(user.get_user_achievements(user_game.appid))
+        completion_time_span = calculate_completion_time_span(user.achievements_by_app.get(user_game.appid, []))
     except Exception as e:
         logger.error(f"Error calculating completion time span: {e}")
         completion_time_span = None
@@ -227,5 +582,5 @@ async def create_and_send_completion_embed(completion_channel, user_game, user,
     embed.set_author(name="Platinum unlocked", icon_url=PLATINUM_ICON)
     embed.set_thumbnail(url=user_game.game_icon)
     embed.set_footer(text=f"Platinum in {completion_time}", icon_url=user.summary.avatarfull)
-    logger.info(f"Sending completion embed for {user.summary.personaname}: All achievements ({user_game.name})")
-    await embed.send_embed(completion_channel)
\ No newline at end of file
+    logger.info(f"Queueing completion embed for {user.summary.personaname}: All achievements ({user_game.name})")
+    return embed.build()
\ No newline at end of file
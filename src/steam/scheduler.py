@@ -0,0 +1,75 @@
+import heapq
+import time
+
+class PollScheduler:
+    """Decides which users get polled on each scheduler tick.
+
+    Users sit in a priority queue ordered by when they are next due. Players who
+    are in-game or whose playtime just moved are polled every `min_interval`,
+    online users every `base_interval`, and offline users back off (doubling) up
+    to `max_interval`. Each tick polls the most overdue users that fit in the
+    request budget; the rest stay due for the next tick.
+    """
+
+    def __init__(self, user_ids, min_interval, base_interval, max_interval, request_budget):
+        self.min_interval = min_interval  # seconds
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.request_budget = request_budget  # requests per tick
+        self.requests_per_poll = 4.0  # running estimate, refined by `record_cost`
+        self.intervals = {}
+        self.due = {}  # steam_id -> epoch time of the next poll
+        self._queue = []  # (due, steam_id); entries no longer matching `due` are skipped
+        now = time.time()
+        for steam_id in dict.fromkeys(user_ids):
+            self.intervals[steam_id] = base_interval
+            self._schedule(steam_id, now)
+
+    def __len__(self):
+        return len(self.due)
+
+    def _schedule(self, steam_id, due):
+        self.due[steam_id] = due
+        heapq.heappush(self._queue, (due, steam_id))
+
+    def due_users(self, now=None):
+        """Pop the users that are due now, most overdue first, within the request budget"""
+        now = time.time() if now is None else now
+        max_users = max(1, int(self.request_budget // max(self.requests_per_poll, 1)))
+        due = []
+        while self._queue and self._queue[0][0] <= now and len(due) < max_users:
+            when, steam_id = heapq.heappop(self._queue)
+            if self.due.get(steam_id) == when:
+                del self.due[steam_id]
+                due.append(steam_id)
+        return due
+
+    def promote(self, steam_id, now=None):
+        """Poll a user soon, e.g. because they just started playing"""
+        now = time.time() if now is None else now
+        if steam_id in self.due and self.due[steam_id] > now + self.min_interval:
+            self._schedule(steam_id, now)
+
+    def record_cost(self, users, requests):
+        """Update the requests-per-poll estimate after polling `users` users with `requests` calls"""
+        if users:
+            self.requests_per_poll = 0.7 * self.requests_per_poll + 0.3 * (requests / users)
+
+    def reschedule(self, steam_id, summary=None, played=False, now=None):
+        """Queue the user's next poll based on what they are doing"""
+        now = time.time() if now is None else now
+        previous = self.intervals.get(steam_id, self.base_interval)
+        if played or (summary is not None and summary.gameid):
+            interval = self.min_interval
+        elif summary is not None and summary.personastate == 0:
+            if summary.lastonline and now - summary.lastonline > 86400:
+                # Offline for over a day: check rarely
+                interval = self.max_interval
+            else:
+                # Offline: back off further every poll that finds nothing
+                interval = min(self.max_interval, max(previous * 2, self.base_interval))
+        else:
+            interval = self.base_interval
+        self.intervals[steam_id] = interval
+        self._schedule(steam_id, now + interval)
+        return interval
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+
+from utils.custom_logger import logger
+
+# How long a worker waits for the bot to confirm delivery before rolling back and polling again
+ACK_TIMEOUT = 600
+# Seconds between liveness checks of the worker processes while no results arrive
+CHECK_INTERVAL = 1.0
+# A worker that dies within STABLE_SECONDS of starting is restarted after a doubling delay
+# (RESTART_DELAY up to MAX_RESTART_DELAY), and given up on after MAX_QUICK_FAILURES such deaths in a row
+STABLE_SECONDS = 60
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+MAX_QUICK_FAILURES = 5
+
+def shard_of(steam_id, shards):
+    """Stable shard number of a user; unlike hash() it is the same in every process and run"""
+    return int.from_bytes(hashlib.sha1(steam_id.encode()).digest()[:8], 'big') % shards
+
+def partition(user_ids, shards):
+    """Split users into `shards` lists by `shard_of`"""
+    parts = [[] for _ in range(shards)]
+    for steam_id in user_ids:
+        parts[shard_of(steam_id, shards)].append(steam_id)
+    return parts
+
+def wait_for_ack(acks, batch_id, timeout):
+    """Block until the bot confirms `batch_id`; acks for other batches (from before a restart) are skipped"""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            if acks.get(timeout=remaining) == batch_id:
+                return True
+        except queue.Empty:
+            return False
+
+async def poll_shard(shard, shards, user_ids, results, acks, stop):
+    from src.steam import functions
+    from config.globals import POLL_MIN_MINUTES
+
+    functions.set_request_share(1 / shards)
+    scheduler = functions.create_scheduler(user_ids, share=1 / shards)
+    functions.restore_state()
+    functions.use_shard_caches(shard)
+    loop = asyncio.get_running_loop()
+    batches = 0
+    logger.info(f"Shard {shard}/{shards} polling {len(user_ids)} user(s) in process {os.getpid()}")
+
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            achievements = await functions.poll_due_users(scheduler, user_ids)
+        except Exception as e:
+            logger.error(f"Shard {shard} poll failed: {e}")
+            achievements = []
+        if achievements:
+            batches += 1
+            batch_id = f"{os.getpid()}-{batches}"
+            results.put((shard, batch_id, achievements))
+            # Snapshots only move forward once the bot has delivered the batch. If it never
+            # confirms, go back to the last saved state so the same unlocks are found again.
+            if await loop.run_in_executor(None, wait_for_ack, acks, batch_id, ACK_TIMEOUT):
+                functions.commit_state()
+            else:
+                logger.warning(f"Shard {shard} batch {batch_id} was not confirmed, rolling back")
+                functions.restore_state()
+        else:
+            functions.commit_state()
+        await functions.flush_caches()
+        await asyncio.sleep(max(0, POLL_MIN_MINUTES * 60 - (time.monotonic() - started)))
+
+def run_worker(shard, shards, user_ids, results, acks, stop):
+    """Entry point of a worker process: poll this shard's users until `stop` is set"""
+    try:
+        asyncio.run(poll_shard(shard, shards, user_ids, results, acks, stop))
+    except KeyboardInterrupt:
+        pass
+
+class ShardSupervisor:
+    """Runs one polling process per shard and hands their results to the bot process.
+
+    Each worker polls a stable hash-partition of the users with its own scheduler and
+    share of the API key budget and cache files, and sends detected unlocks over a queue. Workers
+    commit their snapshots to the state store only after the bot acknowledges a
+    batch, so a crashed worker re-detects anything that wasn't delivered; the bot
+    drops repeats it already delivered. Dead workers are restarted with a growing
+    delay, and a worker that keeps dying right after starting is given up on.
+    """
+
+    def __init__(self, user_ids, shards):
+        self.shards = shards
+        self.parts = partition(user_ids, shards)
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.acks = [self.context.Queue() for _ in range(shards)]
+        self.stop_event = self.context.Event()
+        self.processes = [None] * shards
+        self.started_at = [0.0] * shards
+        self.quick_failures = [0] * shards  # deaths in a row soon after starting
+        self.restart_at = [None] * shards  # monotonic time of a pending restart
+
+    def start(self):
+        for shard in range(self.shards):
+            self._start(shard)
+
+    def _start(self, shard):
+        process = self.context.Process(
+            target=run_worker,
+            args=(shard, self.shards, self.parts[shard], self.results, self.acks[shard], self.stop_event),
+            name=f"steam-shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[shard] = process
+        self.started_at[shard] = time.monotonic()
+        self.restart_at[shard] = None
+
+    def check_workers(self):
+        """Restart workers that died, backing off (and eventually giving up) on ones that keep dying"""
+        if self.stop_event.is_set():
+            return
+        now = time.monotonic()
+        for shard, process in enumerate(self.processes):
+            if process is None or process.is_alive():
+                continue
+            if self.restart_at[shard] is None:
+                if now - self.started_at[shard] < STABLE_SECONDS:
+                    self.quick_failures[shard] += 1
+                else:
+                    self.quick_failures[shard] = 0
+                if self.quick_failures[shard] >= MAX_QUICK_FAILURES:
+                    logger.error(f"Shard {shard} worker exited with code {process.exitcode} {self.quick_failures[shard]} times "
+                                 f"right after starting, giving up; its {len(self.parts[shard])} user(s) are not polled")
+                    self.processes[shard] = None
+                    continue
+                delay = min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** self.quick_failures[shard]) if self.quick_failures[shard] else 0
+                logger.warning(f"Shard {shard} worker exited with code {process.exitcode}, restarting in {delay:.1f}s")
+                self.restart_at[shard] = now + delay
+            if now >= self.restart_at[shard]:
+                self._start(shard)
+
+    def _get(self, timeout):
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def batches(self):
+        """Yield lists of (shard, batch_id, achievements) as they arrive, merging batches that are ready together"""
+        loop = asyncio.get_running_loop()
+        while not self.stop_event.is_set():
+            batch = await loop.run_in_executor(None, self._get, CHECK_INTERVAL)
+            self.check_workers()
+            if batch is None:
+                continue
+            ready = [batch]
+            while (batch := self._get(0)) is not None:
+                ready.append(batch)
+            yield ready
+
+    def ack(self, shard, batch_id):
+        self.acks[shard].put(batch_id)
+
+    def stop(self, timeout=5):
+        """Ask every worker to stop and wait up to `timeout` seconds in all before terminating the rest.
+
+        This blocks; call it from a thread when an event loop is running.
+        """
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is not None:
+                process.join(max(0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
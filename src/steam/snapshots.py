@@ -0,0 +1,110 @@
+class AchievementSnapshots:
+    """Achieved state per (steamid, appid), stored as an int bitset.
+
+    Bit `i` is set when the user has the achievement at position `i` of the game
+    schema. New unlocks are the bits that flipped since the previous snapshot, so
+    detection needs no unlock-time parsing and doesn't depend on cycle timing.
+    """
+
+    def __init__(self):
+        self._snapshots = {}  # (steamid, appid) -> (schema size, bits)
+        self._dirty = set()  # keys changed since the state store last saved them
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    @staticmethod
+    def bitset(user_achievements, positions):
+        """Build the achieved bitset for a user's achievements of one game"""
+        bits = 0
+        for user_achievement in user_achievements:
+            if user_achievement.achieved == 1:
+                position = positions.get(user_achievement.apiname)
+                if position is not None:
+                    bits |= 1 << position
+        return bits
+
+    def get(self, steam_id, app_id):
+        return self._snapshots.get((steam_id, app_id))
+
+    def set(self, steam_id, app_id, size, bits):
+        self._store((steam_id, app_id), (size, bits))
+
+    def load(self, steam_id, app_id, size, bits):
+        """Restore a saved snapshot without marking it as changed"""
+        self._snapshots[(steam_id, app_id)] = (size, bits)
+
+    def _store(self, key, snapshot):
+        if self._snapshots.get(key) != snapshot:
+            self._snapshots[key] = snapshot
+            self._dirty.add(key)
+
+    def dirty(self):
+        """(steamid, appid, size, bits) of every snapshot changed since `clear_dirty`"""
+        return [(*key, *self._snapshots[key]) for key in self._dirty]
+
+    def clear_dirty(self):
+        self._dirty.clear()
+
+    def forget_unlock(self, steam_id, app_id, position):
+        """Clear one achieved bit, so the next `update` reports that unlock as new again"""
+        snapshot = self._snapshots.get((steam_id, app_id))
+        if snapshot is not None and position is not None:
+            self._store((steam_id, app_id), (snapshot[0], snapshot[1] & ~(1 << position)))
+
+    def update(self, steam_id, app_id, size, bits):
+        """Store the new snapshot and return the bits unlocked since the previous one.
+
+        Returns None when there is nothing to compare against (first sighting, or the
+        schema shrank and positions can't be trusted). Steam appends achievements
+        added by game updates, so a grown schema is still compared bit for bit.
+        """
+        previous = self._snapshots.get((steam_id, app_id))
+        self._store((steam_id, app_id), (size, bits))
+        if previous is None or previous[0] > size:
+            return None
+        return (previous[1] ^ bits) & bits
+
+class PlaytimeSnapshots:
+    """Last seen `playtime_forever` and last-played time of every game, per user.
+
+    Used to skip achievement fetches for games that haven't been played since the
+    previous cycle.
+    """
+
+    def __init__(self):
+        self._snapshots = {}  # steamid -> {appid: (playtime_forever, last_played)}
+        self._dirty = set()  # (steamid, appid) changed since the state store last saved them
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def update(self, steam_id, games):
+        """Store the state of `games` and return the appids that changed since the previous call.
+
+        New appids count as changed. Returns None the first time a user is seen.
+        """
+        previous = self._snapshots.get(steam_id)
+        current = {game.appid: (game.playtime_forever, game.last_played) for game in games}
+        self._snapshots[steam_id] = current
+        changed = {appid for appid, state in current.items() if (previous or {}).get(appid) != state}
+        self._dirty.update((steam_id, appid) for appid in changed)
+        return None if previous is None else changed
+
+    def mark_stale(self, steam_id, app_id):
+        """Make `app_id` count as changed next cycle, e.g. after its achievements failed to load"""
+        games = self._snapshots.get(steam_id)
+        if games is not None and app_id in games:
+            games[app_id] = None
+            self._dirty.add((steam_id, app_id))
+
+    def load(self, steam_id, app_id, state):
+        """Restore a saved (playtime_forever, last_played), or None for stale, without marking it as changed"""
+        self._snapshots.setdefault(steam_id, {})[app_id] = state
+
+    def dirty(self):
+        """(steamid, appid, state) of every game changed since `clear_dirty`; state None means stale"""
+        return [(steam_id, app_id, self._snapshots[steam_id].get(app_id)) for steam_id, app_id in self._dirty]
+
+    def clear_dirty(self):
+        self._dirty.clear()
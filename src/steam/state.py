@@ -0,0 +1,128 @@
+from pathlib import Path
+import sqlite3
+import time
+
+from utils.custom_logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivered (
+    key TEXT PRIMARY KEY,
+    delivered_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS completed (
+    steam_id TEXT NOT NULL,
+    app_id INTEGER NOT NULL,
+    completed_at INTEGER NOT NULL,
+    PRIMARY KEY (steam_id, app_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS achievement_snapshots (
+    steam_id TEXT NOT NULL,
+    app_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    bits TEXT NOT NULL,
+    PRIMARY KEY (steam_id, app_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS playtime_snapshots (
+    steam_id TEXT NOT NULL,
+    app_id INTEGER NOT NULL,
+    playtime INTEGER,
+    last_played INTEGER,
+    stale INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (steam_id, app_id)
+) WITHOUT ROWID;
+"""
+
+# SQLite limits the number of parameters per statement
+QUERY_CHUNK = 500
+
+def delivery_key(steam_id, app_id, apiname):
+    return f"{steam_id}:{app_id}:{apiname}"
+
+class StateStore:
+    """Durable bot state in an embedded SQLite database (WAL mode).
+
+    Holds the notifications already delivered, completed (user, game) pairs, the
+    unlock and playtime snapshots, so a restart carries on where the previous
+    run stopped. Nothing is written until `commit`, which
+    the bot calls once per cycle: new deliveries, completions and only the
+    snapshots that changed go out in a single transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._delivered = []  # (key, delivered_at) waiting for commit
+        self._completed = []  # (steam_id, app_id, completed_at)
+
+    @property
+    def connection(self):
+        # Opened on first use, so importing the bot doesn't create the database
+        if self._connection is None:
+            if self.path != ':memory:':
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def load_snapshots(self, achievement_snapshots, playtime_snapshots):
+        for steam_id, app_id, size, bits in self.connection.execute(
+                "SELECT steam_id, app_id, size, bits FROM achievement_snapshots"):
+            achievement_snapshots.load(steam_id, app_id, size, int(bits, 16))
+        for steam_id, app_id, playtime, last_played, stale in self.connection.execute(
+                "SELECT steam_id, app_id, playtime, last_played, stale FROM playtime_snapshots"):
+            playtime_snapshots.load(steam_id, app_id, None if stale else (playtime, last_played))
+
+    def completed_games(self):
+        return {(steam_id, app_id) for steam_id, app_id in self.connection.execute("SELECT steam_id, app_id FROM completed")}
+
+    def delivered(self, keys):
+        """The subset of `keys` that was delivered before (committed or pending)"""
+        keys = list(keys)
+        found = {key for key, _ in self._delivered}.intersection(keys)
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            rows = self.connection.execute(
+                f"SELECT key FROM delivered WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            found.update(key for key, in rows)
+        return found
+
+    def mark_delivered(self, keys):
+        now = int(time.time())
+        self._delivered.extend((key, now) for key in keys)
+
+    def mark_completed(self, steam_id, app_id):
+        self._completed.append((steam_id, app_id, int(time.time())))
+
+    def commit(self, achievement_snapshots=None, playtime_snapshots=None):
+        """Write everything that changed since the last commit in one transaction"""
+        achievements = achievement_snapshots.dirty() if achievement_snapshots is not None else []
+        playtimes = playtime_snapshots.dirty() if playtime_snapshots is not None else []
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO delivered (key, delivered_at) VALUES (?, ?)", self._delivered)
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO completed (steam_id, app_id, completed_at) VALUES (?, ?, ?)", self._completed)
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO achievement_snapshots (steam_id, app_id, size, bits) VALUES (?, ?, ?, ?)",
+                    [(steam_id, app_id, size, format(bits, 'x')) for steam_id, app_id, size, bits in achievements])
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO playtime_snapshots (steam_id, app_id, playtime, last_played, stale) VALUES (?, ?, ?, ?, ?)",
+                    [(steam_id, app_id, *(state or (None, None)), int(state is None)) for steam_id, app_id, state in playtimes])
+        except sqlite3.Error as e:
+            logger.error(f"Error saving bot state to {self.path}: {e}")
+            return False
+        self._delivered.clear()
+        self._completed.clear()
+        if achievement_snapshots is not None:
+            achievement_snapshots.clear_dirty()
+        if playtime_snapshots is not None:
+            playtime_snapshots.clear_dirty()
+        return True
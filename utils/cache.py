@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from pathlib import Path
+import json
+import os
+import tempfile
+import threading
+import time
+
+from utils.custom_logger import logger
+
+class LRUCache:
+    """Bounded in-memory LRU cache with optional TTL and JSON persistence.
+
+    Keys must be strings so the cache can be written to disk as-is. Writes only mark
+    the cache dirty; `save()` flushes it with an atomic temp-file-and-rename.
+    """
+
+    def __init__(self, max_entries=1000, ttl=None, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds, None = never expires
+        self.path = Path(path) if path else None
+        self._data = OrderedDict()  # key -> [stored_at, value]
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._saves = 0  # copies handed out by `prepare_save`
+        self._written = 0  # newest copy on disk
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry[0] > self.ttl:
+            del self._data[key]
+            self.dirty = True
+            return None
+        return entry
+
+    def age(self, key):
+        """Seconds since `key` was stored, or None if it isn't cached"""
+        entry = self._lookup(key)
+        return None if entry is None else time.time() - entry[0]
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value):
+        self._data[key] = [time.time(), value]
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        self.dirty = True
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self.dirty = True
+        return entry[1]
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def load(self):
+        """Load entries from disk, skipping anything expired"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load cache {self.path}: {e}")
+            return
+        for key, entry in data.items():
+            # Older caches stored bare values; treat those as freshly stored
+            if not (isinstance(entry, list) and len(entry) == 2):
+                entry = [time.time(), entry]
+            self._data[key] = entry
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        # Drop expired entries now so they don't get written back
+        for key in list(self._data):
+            self._lookup(key)
+        self.dirty = False
+
+    def save(self):
+        """Atomically write the cache to disk if it changed since the last save"""
+        write = self.prepare_save()
+        if write is not None:
+            write()
+
+    def prepare_save(self):
+        """Take a copy of the entries to save and return a function writing it, or None if nothing changed.
+
+        The copy is cheap and must be taken on the thread that uses the cache; the returned
+        function does the slow serialising and writing and can run in another thread.
+        """
+        if self.path is None or not self.dirty:
+            return None
+        data = dict(self._data)
+        self.dirty = False
+        self._saves += 1
+        save = self._saves
+        return lambda: self._write(data, save)
+
+    def _write(self, data, save):
+        with self._write_lock:
+            # Writes may run in other threads; never replace a newer copy with an older one
+            if save > self._written:
+                self._replace(data)
+                self._written = save
+
+    def _replace(self, data):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as file:
+                    json.dump(data, file)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except BaseException:
+            # Not on disk: try again on the next save
+            self.dirty = True
+            raise
@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
+import time
 
 class DateUtils:
+    # Replays pin "now" to the recorded time (a callable returning epoch seconds)
+    clock = None
 
     """Calculate the age of a Steam account"""
     @staticmethod
@@ -18,6 +21,11 @@ class DateUtils:
     def format_timestamp(timestamp):
         return datetime.fromtimestamp(timestamp).strftime('%d/%m/%y %H:%M:%S')
     
+    """Current time as epoch seconds, comparable with the timestamps Steam returns"""
+    @staticmethod
+    def now_timestamp():
+        return int(DateUtils.clock() if DateUtils.clock is not None else time.time())
+
     """Calculate the seconds until the next hour"""
     @staticmethod
     def seconds_until_next_hour():
@@ -0,0 +1,24 @@
+import aiohttp
+
+# One long-lived keep-alive connection pool shared by everything that talks HTTP
+# from the event loop (Steam API calls, icon downloads, ...)
+_session = None
+
+POOL_SIZE = 100
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = 30
+
+def get_session():
+    """Return the shared aiohttp session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=POOL_SIZE, keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=300)
+        _session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+    return _session
+
+async def close_session():
+    """Close the shared session (call once on shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
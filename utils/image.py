@@ -3,56 +3,125 @@ import requests
 from io import BytesIO
 import numpy as np
 import asyncio
-import json
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 from pathlib import Path
 
+from utils.cache import LRUCache
 from utils.custom_logger import logger
+from utils.http import get_session
 
 # Cache file path
 cache_file_path = Path("src/steam/data/image_cache.json")
+CACHE_MAX_ENTRIES = 5000
+
+# Colors are kept in memory; the file is read once at startup and written back
+# in batches by `save_cache` (after each cycle and on shutdown)
+color_cache = LRUCache(max_entries=CACHE_MAX_ENTRIES, path=cache_file_path)
+
+# Colors currently being computed, so concurrent misses for one URL share the work
+_pending_colors = {}
+
+# The numpy work runs in worker processes so it never competes with the event loop.
+# Workers are spawned, like the shard workers: forking the bot would copy its
+# running event loop, open sockets and logger threads into every child
+COLOR_WORKERS = min(4, os.cpu_count() or 1)
+_process_pool = None
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=COLOR_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = None
 
 # Function to load cache
 def load_cache():
-    if not cache_file_path.exists():
-        return {}
-    with open(cache_file_path, "r") as file:
-        return json.load(file)
+    color_cache.load()
+    return color_cache
 
 # Function to save cache
-def save_cache(cache):
-    with open(cache_file_path, "w") as file:
-        json.dump(cache, file)
+def save_cache():
+    color_cache.save()
 
 # Check if the color is colorful
 def is_colorful(color):
     r, g, b = color
     return np.std([r, g, b])
 
+# Colorfulness of every pixel of an (n, 3) array at once; same values as `is_colorful`
+def colorfulness(pixels):
+    return pixels.astype(np.float64).std(axis=1)
+
 # Asynchronous function to get discord color
-async def get_discord_color(image_url, crop_percentage=0.5):
-    # Load the cache
-    cache = load_cache()
+async def get_discord_color(image_url, crop_percentage=0.5, max_pixels=None):
     # Check if the URL is already in the cache
-    if image_url in cache:
+    color = color_cache.get(image_url)
+    if color is not None:
         logger.debug(f"Cache hit for {image_url}")
-        return cache[image_url]
+        return color
+    # Another embed is already processing this image, wait for its result
+    if image_url in _pending_colors:
+        return await asyncio.shield(_pending_colors[image_url])
     # If not in cache, process the image
-    loop = asyncio.get_event_loop()
-    color = await loop.run_in_executor(
-        None,
-        get_discord_color_blocking,
-        image_url,
-        crop_percentage,
-    )
+    future = asyncio.ensure_future(fetch_discord_color(image_url, crop_percentage, max_pixels))
+    _pending_colors[image_url] = future
+    try:
+        color = await asyncio.shield(future)
+    finally:
+        del _pending_colors[image_url]
     # Update the cache with the new color
-    cache[image_url] = color
-    save_cache(cache)
+    color_cache.set(image_url, color)
     return color
 
+# Download through the shared connection pool, analyse in the process pool
+async def fetch_discord_color(image_url, crop_percentage=0.5, max_pixels=None):
+    async with get_session().get(image_url) as response:
+        data = await response.read()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_process_pool(),
+        dominant_color_from_bytes,
+        data,
+        crop_percentage,
+        max_pixels,
+    )
+
+# Resolve the colors of many images at once, e.g. every game icon of a cycle
+# before its embeds are sent. Failures are logged and left to the send path.
+async def prefetch_colors(image_urls, crop_percentage=0.5, max_pixels=None):
+    urls = [url for url in set(image_urls) if url and url not in color_cache]
+    if not urls:
+        return
+    results = await asyncio.gather(
+        *(get_discord_color(url, crop_percentage, max_pixels) for url in urls),
+        return_exceptions=True,
+    )
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not prefetch color for {url}: {result}")
+    logger.debug(f"Prefetched colors for {len(urls)} images")
+
 # Blocking function to get discord color
-def get_discord_color_blocking(image_url, crop_percentage=0.5):
+def get_discord_color_blocking(image_url, crop_percentage=0.5, max_pixels=None):
     response = requests.get(image_url)
-    img = Image.open(BytesIO(response.content))
+    return dominant_color_from_bytes(response.content, crop_percentage, max_pixels)
+
+def dominant_color_from_bytes(data, crop_percentage=0.5, max_pixels=None):
+    img = Image.open(BytesIO(data))
+    return dominant_color(img, crop_percentage, max_pixels)
+
+# Most colorful pixel of the centre crop of an image, as a discord color int.
+# With `max_pixels` the crop is first shrunk (nearest neighbour, so only real
+# pixel colors remain) to at most that many pixels; the result may then differ
+# slightly from the exact one for large images.
+def dominant_color(img, crop_percentage=0.5, max_pixels=None):
     width, height = img.size
     crop_width = int(width * crop_percentage)
     crop_height = int(height * crop_percentage)
@@ -61,9 +130,13 @@ def get_discord_color_blocking(image_url, crop_percentage=0.5):
     right = left + crop_width
     bottom = top + crop_height
     img = img.crop((left, top, right, bottom))
+    if max_pixels and crop_width * crop_height > max_pixels:
+        scale = (max_pixels / (crop_width * crop_height)) ** 0.5
+        img = img.resize((max(1, int(crop_width * scale)), max(1, int(crop_height * scale))), Image.Resampling.NEAREST)
     img = img.convert("RGB")
     img_array = np.array(img)
     img_flattened = img_array.reshape(-1, 3)
-    colorfulness = np.apply_along_axis(is_colorful, 1, img_flattened)
-    most_colorful_color = img_flattened[np.argmax(colorfulness)]
-    return int('0x{:02x}{:02x}{:02x}'.format(*most_colorful_color), 16)
\ No newline at end of file
+    most_colorful_color = img_flattened[np.argmax(colorfulness(img_flattened))]
+    return int('0x{:02x}{:02x}{:02x}'.format(*most_colorful_color), 16)
+
+load_cache()
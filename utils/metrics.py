@@ -0,0 +1,141 @@
+from contextlib import contextmanager
+import bisect
+import time
+
+from aiohttp import web
+
+from utils.custom_logger import logger
+
+# Histogram bucket bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'last')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction `q` of observations fall"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+class Metrics:
+    """In-process counters, gauges and latency histograms, rendered in Prometheus text format.
+
+    Series are keyed by metric name plus a sorted tuple of label pairs. Callbacks
+    registered with `on_collect` run before every render, to copy values kept
+    elsewhere (cache hit counts, ...) into gauges.
+    """
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.help = {}  # name -> help text
+        self._collectors = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def histogram(self, name, **labels):
+        return self.histograms.get(self._key(name, labels))
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the `with` block into histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def on_collect(self, callback):
+        self._collectors.append(callback)
+
+    def collect(self):
+        for callback in self._collectors:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = labels + tuple(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+    def render(self):
+        """All series in Prometheus text exposition format"""
+        self.collect()
+        lines = []
+        for kind, series in (('counter', self.counters), ('gauge', self.gauges), ('histogram', self.histograms)):
+            names = sorted({name for name, _ in series})
+            for name in names:
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name != name:
+                        continue
+                    if kind != 'histogram':
+                        lines.append(f"{name}{self._labels(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ('+Inf',), value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {value.sum}")
+                    lines.append(f"{name}_count{self._labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+async def start_metrics_server(port, host='127.0.0.1'):
+    """Serve `metrics` at http://host:port/metrics; returns the runner to clean up on shutdown"""
+    async def handle(request):
+        return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner